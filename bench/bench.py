@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PyStudioMusic benchmark harness.
+
+Generates synthetic catalogs (a legacy apps.custom of N entries plus a
+matching dpkg status database) and times the catalog, status, save and
+apt code paths against stand-in dpkg-query/apt-get/sudo executables
+with a configurable latency. Every catalog size runs in a fresh
+interpreter with its own HOME, so nothing touches the real system.
+
+    python3 bench/bench.py                          # 100, 1k, 10k, 50k entries
+    python3 bench/bench.py --sizes 1000 --latency 0.2 --output base.json
+    python3 bench/bench.py --baseline base.json     # exit status 1 on regression
+    xvfb-run -a python3 bench/bench.py --gui        # also time the GTK window
+
+Results are JSON: one record per (size, metric) with the median, minimum
+and every run in seconds.
+
+Author: Luca Bocaletto
+License: GPLv3
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+# Every third synthetic package is installed
+INSTALLED_EVERY = 3
+
+WORDS = ["analog", "bass", "chorus", "delay", "echo", "filter", "groove", "harmonic",
+         "loop", "midi", "noise", "organ", "piano", "reverb", "sampler", "synth",
+         "tape", "vocoder", "wave", "zither"]
+
+# -------------------------------------------------------------------
+# Stand-in executables; BENCH_LATENCY seconds are added to every call
+# -------------------------------------------------------------------
+
+STUB_DPKG_QUERY = '''#!/usr/bin/env python3
+import os, sys, time
+time.sleep(float(os.environ.get("BENCH_LATENCY", "0")))
+for pkg in sys.argv[1:]:
+    if pkg.startswith("-"):
+        continue
+    num = pkg[3:]
+    installed = num.isdigit() and int(num) % {every} == 0
+    print(pkg + "\\t" + ("install ok installed" if installed else "deinstall ok config-files"))
+'''
+
+STUB_APT_GET = '''#!/usr/bin/env python3
+import os, sys, time
+time.sleep(float(os.environ.get("BENCH_LATENCY", "0")))
+args = sys.argv[1:]
+pkgs = [a for a in args if not a.startswith("-") and a not in ("install", "update")
+        and "=" not in a and not a.startswith("APT::") and not a.startswith("Dpkg::")]
+if "-s" in args:
+    print("Need to get %d kB of archives." % (1500 * len(pkgs)))
+    print("After this operation, %d kB of additional disk space will be used." % (4200 * len(pkgs)))
+    for pkg in pkgs:
+        if pkg.endswith("-"):
+            print("Remv %s [1.0-1]" % pkg[:-1])
+        else:
+            print("Inst %s (1.0-1 Bench:stable [amd64])" % pkg)
+            print("Inst lib%s0 (1.0-1 Bench:stable [amd64])" % pkg)
+elif "--print-uris" not in args and "install" in args:
+    for i, pkg in enumerate(pkgs):
+        pct = 100.0 * (i + 1) / len(pkgs)
+        print("dlstatus:%s:%.1f:Retrieving %s" % (pkg, pct / 2, pkg))
+        print("pmstatus:%s:%.1f:Installing %s" % (pkg, pct, pkg))
+'''
+
+STUB_SUDO = '''#!/bin/sh
+exec "$@"
+'''
+
+
+def write_stubs(bin_dir: Path):
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, text in (("dpkg-query", STUB_DPKG_QUERY.format(every=INSTALLED_EVERY)),
+                       ("apt-get", STUB_APT_GET), ("sudo", STUB_SUDO)):
+        path = bin_dir / name
+        path.write_text(text, encoding="utf-8")
+        path.chmod(0o755)
+
+
+# -------------------------------------------------------------------
+# Synthetic data
+# -------------------------------------------------------------------
+
+def write_catalog(home: Path, size: int, categories):
+    """Legacy apps.custom with `size` entries (imported into apps.db on first load)."""
+    config = home / ".pystudiomusic"
+    config.mkdir(parents=True, exist_ok=True)
+    with open(config / "apps.custom", "w", encoding="utf-8") as fh:
+        for i in range(size):
+            a, b = WORDS[i % len(WORDS)], WORDS[(i // len(WORDS)) % len(WORDS)]
+            fh.write(f"app{i}|{a.title()} {b.title()} {i}|{categories[i % len(categories)]}|"
+                     f"{a} {b} tool number {i}|pkg{i}|true\n")
+    # Keep the benchmark to the synthetic catalog
+    (config / "settings.json").write_text(json.dumps({"import_sections": []}), encoding="utf-8")
+
+
+def write_dpkg_status(path: Path, size: int):
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(size):
+            status = "install ok installed" if i % INSTALLED_EVERY == 0 else "deinstall ok config-files"
+            fh.write(f"Package: pkg{i}\nStatus: {status}\nPriority: optional\n"
+                     f"Section: sound\nInstalled-Size: {100 + i % 900}\nVersion: 1.0-{i}\n"
+                     f"Description: synthetic package {i}\n\n")
+
+
+# -------------------------------------------------------------------
+# Worker: one catalog size, in a fresh interpreter
+# -------------------------------------------------------------------
+
+def timed(results, metric, func, repeat=1, setup=None):
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    results.append({"metric": metric, "seconds": statistics.median(runs),
+                    "min": min(runs), "runs": runs})
+
+
+def run_worker(size, repeat, gui) -> list:
+    sys.path.insert(0, str(REPO_DIR))
+    import core
+
+    work = Path(os.environ["BENCH_WORK"])
+    status_file = work / "status"
+    write_dpkg_status(status_file, size)
+    (work / "updates").mkdir(exist_ok=True)
+    (work / "lists").mkdir(exist_ok=True)
+    core.DPKG_STATUS = status_file
+    core.DPKG_UPDATES = work / "updates"
+    core.APT_LISTS_DIR = work / "lists"
+
+    results = []
+
+    # Catalog: first load imports apps.custom into SQLite, later loads read it
+    timed(results, "legacy_import", core.load_catalog)
+    timed(results, "load_catalog", core.load_catalog, repeat)
+
+    # Install status: cold (no status cache), warm, and via dpkg-query
+    drop_cache = lambda: core.STATUS_CACHE_FILE.unlink(missing_ok=True)
+    timed(results, "load_apps_cold", core.load_apps, repeat, setup=drop_cache)
+    timed(results, "load_apps_warm", core.load_apps, repeat)
+    pkgs = [entry.pkg for entry in core.apps.values()]
+    timed(results, "status_dpkg_query", lambda: core._query_dpkg_status(set(pkgs)), repeat)
+
+    # Search
+    timed(results, "search", lambda: [core.search_index.search(q)
+                                      for q in ("s", "syn", "synth", "reverb tape", "app12")],
+          repeat)
+
+    # Saving: full rewrite, and the per-entry writes used by the GUI
+    timed(results, "save_custom_apps", core.save_custom_apps, repeat)
+    extra = core.AppEntry("bench-extra", "Bench Extra", "Utility", "d", "pkg-extra", "true",
+                          custom=True)
+
+    def add_update_delete():
+        core.add_custom_app(extra)
+        extra.description = "changed"
+        core.update_custom_app(extra)
+        core.delete_custom_app(extra.uid)
+    timed(results, "custom_entry_add_update_delete", add_update_delete, repeat)
+
+    # apt: simulation (cold, then cached) and a small transaction
+    plan = core.TransactionPlan(install=pkgs[1:11:2], remove=pkgs[0:10:3])
+    timed(results, "estimate_plan_cold", lambda: core.estimate_plan(plan), 1,
+          setup=core._estimate_cache.clear)
+    timed(results, "estimate_plan_cached", lambda: core.estimate_plan(plan), repeat)
+
+    def transaction():
+        import threading
+        done = threading.Event()
+        core.AptTransaction(plan.cmds(), lambda *a: None, lambda line: None,
+                            lambda ok, message: done.set()).start()
+        done.wait()
+    timed(results, "apt_transaction", transaction, repeat)
+
+    if gui:
+        results += run_gui(size, repeat)
+    return results
+
+
+def run_gui(size, repeat) -> list:
+    """Time the GTK window; needs a display (e.g. xvfb-run)."""
+    import main
+    from main import Gtk
+
+    def flush():
+        while Gtk.events_pending():
+            Gtk.main_iteration_do(False)
+
+    results = []
+    holder = {}
+
+    def startup():
+        holder["win"] = main.MainWindow()
+        flush()
+    timed(results, "gui_startup", startup)
+    win = holder["win"]
+
+    def until_probed():
+        deadline = time.monotonic() + 120
+        while any(e.installed is None for e in main.apps.values()) and time.monotonic() < deadline:
+            Gtk.main_iteration_do(False)
+        flush()
+    timed(results, "gui_status_probe", until_probed)
+
+    timed(results, "gui_refresh_store", lambda: (win._refresh_store(), flush()), repeat)
+
+    rows = min(100, size)
+
+    def toggle():
+        for row in range(rows):
+            win._on_toggle_desired(None, Gtk.TreePath(row))
+        flush()
+    timed(results, f"gui_toggle_{rows}_rows", toggle, repeat)
+
+    def type_search():
+        for text in ("s", "sy", "syn", "synt", "synth", ""):
+            win.search_entry.set_text(text)
+            win._on_search_changed(win.search_entry)
+            flush()
+        while win._vis_pending:
+            Gtk.main_iteration_do(False)
+    timed(results, "gui_search_typing", type_search, repeat)
+
+    win.destroy()
+    flush()
+    return results
+
+
+# -------------------------------------------------------------------
+# Driver
+# -------------------------------------------------------------------
+
+def run_size(size, args) -> list:
+    import core  # only for CATEGORIES; the worker imports it afresh
+    with tempfile.TemporaryDirectory(prefix=f"pystudiomusic-bench-{size}-") as tmp:
+        tmp = Path(tmp)
+        write_stubs(tmp / "bin")
+        write_catalog(tmp / "home", size, core.CATEGORIES)
+        env = dict(os.environ, HOME=str(tmp / "home"), BENCH_WORK=str(tmp),
+                   BENCH_LATENCY=str(args.latency),
+                   PATH=f"{tmp / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}")
+        env.pop("PYSTUDIOMUSIC_TRACE", None)
+        cmd = [sys.executable, __file__, "--worker", str(size), "--repeat", str(args.repeat)]
+        if args.gui:
+            cmd.append("--gui")
+        proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, text=True,
+                              cwd=REPO_DIR)
+        if proc.returncode != 0:
+            sys.exit(f"bench: worker for size {size} failed (exit status {proc.returncode})")
+        return [dict(record, size=size) for record in json.loads(proc.stdout)]
+
+
+def compare(results, baseline_path, tolerance) -> list:
+    """Return the records slower than the baseline by more than `tolerance`."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    base = {(r["size"], r["metric"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for record in results:
+        before = base.get((record["size"], record["metric"]))
+        if before and record["seconds"] > before * (1 + tolerance):
+            regressions.append({"size": record["size"], "metric": record["metric"],
+                                "baseline": before, "seconds": record["seconds"],
+                                "ratio": record["seconds"] / before})
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark PyStudioMusic on synthetic catalogs.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated catalog sizes (default: %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every stand-in dpkg-query/apt-get call")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per metric (median reported)")
+    parser.add_argument("--gui", action="store_true",
+                        help="also time the GTK window (needs a display, e.g. xvfb-run -a)")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="compare with an earlier --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (default: %(default)s)")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.worker is not None:
+        json.dump(run_worker(args.worker, args.repeat, args.gui), sys.stdout)
+        return 0
+
+    sys.path.insert(0, str(REPO_DIR))
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        print(f"bench: {size} entries…", file=sys.stderr)
+        results += run_size(size, args)
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "latency": args.latency, "repeat": args.repeat, "gui": args.gui,
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+        "results": results,
+    }
+    status = 0
+    if args.baseline:
+        report["regressions"] = compare(results, args.baseline, args.tolerance)
+        for item in report["regressions"]:
+            print(f"bench: regression: {item['metric']} @ {item['size']}: "
+                  f"{item['baseline']:.4f}s -> {item['seconds']:.4f}s", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
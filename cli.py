@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PyStudioMusic command-line interface.
+
+Lists, checks, installs, removes and launches catalog applications
+without GTK, e.g. from scripts or over SSH:
+
+    pystudiomusic list --category DAW
+    pystudiomusic --json status ardour carla
+    pystudiomusic install --yes hydrogen
+    pystudiomusic remove --purge lmms
+    pystudiomusic launch jackd2 qsynth
+    pystudiomusic session save live jackd2 ardour qsynth
+    pystudiomusic session restore live
+    pystudiomusic audit
+    pystudiomusic profile ardour --rt 70 --cpus 2,3 --env PIPEWIRE_QUANTUM=128/48000
+
+Author: Luca Bocaletto
+License: GPLv3
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+
+from core import (
+    VERSION, AptTransaction, LaunchProfile, StudioSession, TransactionPlan, apps,
+    custom_store, launch_profiles, search_index, add_archive_entries, archive_entries,
+    ensure_config_dir, estimate_plan, installed_packages, launch_groups, load_catalog, probe_ready, readiness_probe,
+    removal_impact, run_audit, set_launch_profile, spawn_app, wait_until_ready,
+)
+
+
+def _entry_dict(entry, with_status=False) -> dict:
+    data = {
+        "uid": entry.uid,
+        "name": entry.name,
+        "category": entry.category,
+        "description": entry.description,
+        "pkg": entry.pkg,
+        "cmd": entry.cmd,
+        "custom": entry.custom,
+    }
+    if entry.version:
+        data["version"] = entry.version
+    if with_status:
+        data["installed"] = entry.installed
+    return data
+
+
+_archive_loaded = False
+
+
+def _load_archive():
+    """
+    Add the packages imported from the apt indexes to the catalog, once.
+    Parsing them can take a while after `apt-get update`, so commands
+    only do it when built-in and custom entries are not enough.
+    """
+    global _archive_loaded
+    if not _archive_loaded:
+        add_archive_entries(archive_entries(entry.pkg for entry in apps.values()))
+        _archive_loaded = True
+
+
+def _select(uids):
+    """Return the catalog entries for `uids` (all if empty); exit on unknown ids."""
+    if not uids:
+        _load_archive()
+        return sorted(apps.values(), key=lambda e: e.name.lower())
+    if any(uid not in apps for uid in uids):
+        _load_archive()
+    unknown = [uid for uid in uids if uid not in apps]
+    if unknown:
+        sys.exit(f"pystudiomusic: unknown application id: {', '.join(unknown)}")
+    return [apps[uid] for uid in uids]
+
+
+def _probe(entries):
+    installed = installed_packages(entry.pkg for entry in entries)
+    for entry in entries:
+        entry.installed = entry.pkg in installed
+        entry.desired = entry.installed
+
+
+def _emit(args, data, lines):
+    if args.json:
+        json.dump(data, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        for line in lines:
+            print(line)
+
+
+# -------------------------------------------------------------------
+# Sub-commands
+# -------------------------------------------------------------------
+
+def cmd_list(args) -> int:
+    entries = _select([])
+    if args.category:
+        entries = [e for e in entries if e.category == args.category]
+    if args.search:
+        matches = search_index.search(args.search)
+        if matches is not None:
+            entries = [e for e in entries if e.uid in matches]
+    _emit(args, [_entry_dict(e) for e in entries],
+          [f"{e.uid:<16} {e.name:<18} {e.category:<12} {e.description}" for e in entries])
+    return 0
+
+
+def cmd_status(args) -> int:
+    entries = _select(args.uids)
+    _probe(entries)
+    if not args.uids and not args.all:
+        entries = [e for e in entries if e.installed]
+    _emit(args, [_entry_dict(e, with_status=True) for e in entries],
+          [f"{'✔' if e.installed else '✖'} {e.name} — {e.category}" for e in entries])
+    return 0
+
+
+def _run_plan(args, plan) -> int:
+    """Confirm and run a TransactionPlan, streaming apt's progress."""
+    if plan.is_empty():
+        _emit(args, {"ok": True, "plan": {}, "message": "Nothing to do."}, ["Nothing to do."])
+        return 0
+    if not args.yes:
+        print(plan.describe(), file=sys.stderr)
+        print(estimate_plan(plan).describe(), file=sys.stderr)
+        if plan.remove or plan.purge:
+            print(removal_impact(plan.remove + plan.purge).describe(), file=sys.stderr)
+        print("Proceed? [y/N] ", end="", file=sys.stderr, flush=True)
+        if sys.stdin.readline().strip().lower() not in ("y", "yes"):
+            return 1
+
+    done = threading.Event()
+    result = {}
+
+    def on_progress(fraction, text):
+        if not args.json:
+            print(f"[{fraction * 100:3.0f}%] {text}", file=sys.stderr)
+
+    def on_line(line):
+        if not args.json:
+            print(line)
+
+    def on_done(ok, message):
+        result.update(ok=ok, message=message)
+        done.set()
+
+    transaction = AptTransaction(plan.cmds(), on_progress, on_line, on_done)
+    transaction.start()
+    try:
+        while not done.wait(0.2):
+            pass
+    except KeyboardInterrupt:
+        if transaction.committed:
+            print("Cancelling after the current step…", file=sys.stderr)
+        transaction.cancel()
+        done.wait()
+
+    summary = {"install": plan.install, "remove": plan.remove, "purge": plan.purge}
+    _emit(args, {"ok": result["ok"], "plan": summary, "message": result["message"]},
+          [result["message"]] if result["message"] else [])
+    return 0 if result["ok"] else 1
+
+
+def cmd_install(args) -> int:
+    entries = _select(args.uids)
+    _probe(entries)
+    return _run_plan(args, TransactionPlan(install=[e.pkg for e in entries if not e.installed]))
+
+
+def cmd_remove(args) -> int:
+    _load_archive()  # catalog apps among the dependents of the removal
+    entries = _select(args.uids)
+    _probe(entries)
+    pkgs = [e.pkg for e in entries if e.installed]
+    plan = TransactionPlan(remove=pkgs, purge=pkgs if args.purge else ())
+    return _run_plan(args, plan)
+
+
+def cmd_launch(args) -> int:
+    return _launch(args, *launch_groups(_select(args.uids)))
+
+
+def _launch(args, servers, clients, profiles=None, session=None, started_at=None) -> int:
+    """
+    Start `servers`, wait until they are ready, then start `clients`. For a
+    restored `session`, report the time since `started_at` as well.
+    """
+    launched, failed = [], []
+    profiles = profiles or {}
+
+    def start(entry) -> bool:
+        if not entry.cmd:
+            failed.append({"uid": entry.uid, "error": "no launch command"})
+            return False
+        try:
+            proc, warnings = spawn_app(entry, profiles.get(entry.uid), start_new_session=True,
+                                       stdin=subprocess.DEVNULL)
+        except OSError as exc:
+            failed.append({"uid": entry.uid, "error": str(exc)})
+            return False
+        launched.append({"uid": entry.uid, "pid": proc.pid, "warnings": warnings})
+        return True
+
+    # Audio servers first; clients once the servers accept connections
+    started = [e for e in servers if not probe_ready(readiness_probe(e)) and start(e)]
+    not_ready = [e.uid for e in wait_until_ready(started)]
+    for entry in clients:
+        start(entry)
+
+    data = {"launched": launched, "failed": failed, "not_ready": not_ready}
+    lines = []
+    if session is not None:
+        data.update(session=session, seconds=round(time.monotonic() - started_at, 3))
+        lines.append(f"session {session}: restored in {data['seconds']:.3f} s")
+    _emit(args, data,
+          lines + [f"{item['uid']}: pid {item['pid']}"
+                   + "".join(f" ({w})" for w in item["warnings"]) for item in launched]
+          + [f"{item['uid']}: {item['error']}" for item in failed]
+          + [f"{uid}: not ready in time" for uid in not_ready])
+    return 1 if failed else 0
+
+
+def cmd_session(args) -> int:
+    if args.action == "list":
+        names = custom_store.session_names()
+        _emit(args, names, names)
+        return 0
+    if not args.name:
+        sys.exit(f"pystudiomusic: session {args.action} needs a session name")
+    if args.action == "save":
+        if not args.uids:
+            sys.exit("pystudiomusic: session save needs at least one application id")
+        session = StudioSession.from_entries(args.name, _select(args.uids))
+        custom_store.save_session(session)
+        _emit(args, {"session": args.name, "plan": session.plan},
+              [f"session {args.name}: " + ", ".join(item["uid"] for item in session.plan)])
+        return 0
+    if args.action == "delete":
+        custom_store.delete_session(args.name)
+        return 0
+
+    # restore: everything needed is in the saved plan, no catalog load
+    started_at = time.monotonic()
+    session = custom_store.session(args.name)
+    if session is None:
+        sys.exit(f"pystudiomusic: no such session: {args.name}")
+    servers, clients, profiles = session.launch_plan()
+    return _launch(args, servers, clients, profiles, args.name, started_at)
+
+
+def cmd_profile(args) -> int:
+    entry = _select([args.uid])[0]
+    profile = launch_profiles.get(entry.uid, LaunchProfile())
+    if args.clear:
+        profile = LaunchProfile()
+    if args.nice is not None:
+        profile.nice = args.nice
+    if args.rt is not None:
+        profile.rt_priority = args.rt
+    if args.cpus is not None:
+        profile.cpus = sorted({int(cpu) for cpu in args.cpus.split(",") if cpu.strip()})
+    if args.io_class is not None:
+        profile.io_class = None if args.io_class == "none" else args.io_class
+    if args.io_priority is not None:
+        profile.io_priority = args.io_priority
+    for item in args.env:
+        name, _, value = item.partition("=")
+        if value:
+            profile.env[name] = value
+        else:
+            profile.env.pop(name, None)
+    set_launch_profile(entry.uid, profile)
+
+    data = profile.to_dict()
+    _emit(args, {"uid": entry.uid, "profile": data},
+          [f"{entry.uid}: " + ", ".join(f"{k}={v}" for k, v in data.items())])
+    return 0
+
+
+def cmd_audit(args) -> int:
+    results = run_audit(args.root)
+    marks = {True: "✔", False: "✖", None: "?"}
+    lines = []
+    for result in results:
+        lines.append(f"{marks[result.ok]} {result.title:<26} {result.detail}")
+        if result.fix:
+            lines.append(f"  fix: {result.fix}")
+    _emit(args, [result.to_dict() for result in results], lines)
+    return 1 if any(result.ok is False for result in results) else 0
+
+
+def _cpu_list(text) -> str:
+    if not all(cpu.strip().isdigit() for cpu in text.split(",") if cpu.strip()):
+        raise argparse.ArgumentTypeError(f"not a CPU list: {text!r}")
+    return text
+
+
+# -------------------------------------------------------------------
+# Entry point
+# -------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pystudiomusic",
+        description="Manage audio & music-production software on Debian/Ubuntu.")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {VERSION}")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="list the catalog")
+    p.add_argument("--category", help="only this category")
+    p.add_argument("--search", help="only entries matching this text")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("status", help="show install status (installed apps by default)")
+    p.add_argument("--all", action="store_true", help="include apps that are not installed")
+    p.add_argument("uids", nargs="*", metavar="ID")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("install", help="install applications")
+    p.add_argument("-y", "--yes", action="store_true", help="do not ask for confirmation")
+    p.add_argument("uids", nargs="+", metavar="ID")
+    p.set_defaults(func=cmd_install)
+
+    p = sub.add_parser("remove", help="remove applications")
+    p.add_argument("-y", "--yes", action="store_true", help="do not ask for confirmation")
+    p.add_argument("--purge", action="store_true", help="also delete configuration files")
+    p.add_argument("uids", nargs="+", metavar="ID")
+    p.set_defaults(func=cmd_remove)
+
+    p = sub.add_parser("launch", help="start applications")
+    p.add_argument("uids", nargs="+", metavar="ID")
+    p.set_defaults(func=cmd_launch)
+
+    p = sub.add_parser("session", help="save, list, restore or delete named sessions")
+    p.add_argument("action", choices=["list", "save", "restore", "delete"])
+    p.add_argument("name", nargs="?", metavar="NAME")
+    p.add_argument("uids", nargs="*", metavar="ID", help="applications to save (save only)")
+    p.set_defaults(func=cmd_session, catalog=False)
+
+    p = sub.add_parser("audit", help="check the system for low-latency audio problems")
+    p.add_argument("--root", default="/", help="check this tree instead of / (e.g. a test fixture)")
+    p.set_defaults(func=cmd_audit, catalog=False)
+
+    p = sub.add_parser("profile", help="show or change an application's launch profile")
+    p.add_argument("--nice", type=int, choices=range(-20, 20), metavar="N",
+                   help="nice level, -20..19")
+    p.add_argument("--rt", type=int, choices=range(0, 100), metavar="PRIO",
+                   help="SCHED_FIFO priority 1..99, 0 for normal scheduling")
+    p.add_argument("--cpus", type=_cpu_list, help="comma-separated CPUs to pin to ('' for any)")
+    p.add_argument("--io-class", choices=["realtime", "best-effort", "idle", "none"])
+    p.add_argument("--io-priority", type=int, choices=range(0, 8), metavar="N",
+                   help="I/O priority 0..7 within the class")
+    p.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                   help="set an environment variable (NAME= to unset); repeatable")
+    p.add_argument("--clear", action="store_true", help="start from the default profile")
+    p.add_argument("uid", metavar="ID")
+    p.set_defaults(func=cmd_profile)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    ensure_config_dir()
+    if getattr(args, "catalog", True) or getattr(args, "action", None) == "save":
+        load_catalog(archive=False)  # see _load_archive
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
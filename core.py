@@ -0,0 +1,2413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PyStudioMusic core: catalog, package status and apt transactions.
+
+Everything here works without GTK, so it can be imported by the GUI
+(main.py) as well as by the command-line interface (cli.py).
+
+Author: Luca Bocaletto
+License: GPLv3
+"""
+
+import atexit
+import errno
+import functools
+import itertools
+import json
+import mmap
+import os
+import pwd
+import re
+import resource
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+# -------------------------------------------------------------------
+# Configuration constants
+# -------------------------------------------------------------------
+
+VERSION = "1.0.0"
+HOME = Path.home()
+CONFIG_DIR = HOME / ".pystudiomusic"
+CUSTOM_DB = CONFIG_DIR / "apps.db"
+CUSTOM_FILE = CONFIG_DIR / "apps.custom"  # legacy format, imported into CUSTOM_DB
+
+STATUS_CACHE_FILE = CONFIG_DIR / "status.cache"
+STATUS_CACHE_VERSION = 2  # bumped when the meaning of "installed" changes
+IMPORT_CACHE_FILE = CONFIG_DIR / "import.cache"
+SETTINGS_FILE = CONFIG_DIR / "settings.json"
+APT_UPDATE_STAMP = CONFIG_DIR / "apt-update.stamp"
+PREFETCH_DIR = CONFIG_DIR / "archives"  # packages downloaded ahead of Apply
+
+# Downloaded apt package indexes, and apt's cache of package archives
+APT_LISTS_DIR = Path("/var/lib/apt/lists")
+APT_ARCHIVES_DIR = Path("/var/cache/apt/archives")
+
+# dpkg database holding the state of every known package, plus the
+# journal directory dpkg writes to while a transaction is in progress
+DPKG_STATUS = Path("/var/lib/dpkg/status")
+DPKG_UPDATES = Path("/var/lib/dpkg/updates")
+
+# User-tunable settings, overridden by SETTINGS_FILE
+DEFAULT_SETTINGS = {
+    # When Apply runs `apt-get update` before installing:
+    #   "age"     - only if the apt indexes are older than update_max_age
+    #   "session" - at most once per run of PyStudioMusic
+    #   "always"  - every time
+    "update_policy": "age",
+    "update_max_age": 6 * 3600,  # seconds
+    # Archive sections whose packages are imported into the catalog
+    # from the local apt indexes (an empty list disables the import)
+    "import_sections": ["sound"],
+    # Download the archives of packages marked for install in the
+    # background, at most prefetch_jobs packages at a time
+    "prefetch": False,
+    "prefetch_jobs": 2,
+    # Run package transactions through one long-lived privileged helper
+    # (true), through sudo for every run (false), or against the helper's
+    # fake backend without root ("fake", for testing)
+    "privileged_helper": True,
+}
+
+# Settings limited to a few values; any other setting must have the
+# type of its DEFAULT_SETTINGS value
+SETTING_CHOICES = {
+    "update_policy": ("age", "session", "always"),
+    "privileged_helper": (True, False, "fake"),
+}
+
+# Catalog category given to packages imported from the apt indexes
+IMPORTED_CATEGORY = "Archive"
+
+# Entries in this category are launched first, and their clients only
+# once a readiness probe succeeds (or READY_TIMEOUT seconds pass)
+SERVER_CATEGORY = "Server"
+READY_TIMEOUT = 10.0
+
+# Thresholds of the low-latency system audit
+AUDIT_MIN_RTPRIO = 70                 # JACK and PipeWire ask for up to 88-95
+AUDIT_MIN_MEMLOCK = 256 * 1024 ** 2   # bytes, unless unlimited
+AUDIT_MAX_SWAPPINESS = 10
+AUDIT_MIN_HZ = 1000
+
+# Privileged helper (helper.py): started once through sudo, it runs the
+# package transactions of the session. The protocol version must match.
+HELPER_SCRIPT = Path(__file__).resolve().with_name("helper.py")
+HELPER_PROTOCOL = 1
+
+# Debian package name, optionally with an architecture qualifier
+PACKAGE_NAME = re.compile(r"^[a-z0-9][a-z0-9+.-]+(:[a-z0-9-]+)?$")
+
+# Timing spans kept in memory (oldest dropped first). Setting TRACE_ENV
+# turns tracing on at startup; a value other than "1" is also the path
+# the Chrome trace is written to when the program exits.
+TRACE_CAPACITY = 10000
+TRACE_ENV = "PYSTUDIOMUSIC_TRACE"
+
+# Readiness probes for audio servers: uid -> (kind, target)
+#   "socket"  : Unix socket accepting connections; {uid} and {runtime_dir}
+#               are filled in
+#   "process" : process name (as in /proc/<pid>/comm) that is running
+#   "command" : command that exits with status 0
+# Servers without an entry here are probed by their command's process name.
+READINESS_PROBES = {
+    "jackd2":     ("socket", "/dev/shm/jack_default_{uid}_0"),
+    "pipewire":   ("socket", "{runtime_dir}/pipewire-0"),
+    "pulseaudio": ("socket", "{runtime_dir}/pulse/native"),
+}
+
+# Categories for user‐custom applications
+CATEGORIES = [
+    "DAW", "Editor", "Server", "Synthesizer",
+    "Plugin Host", "Looper", "DJ", "Patchbay",
+    "Suite", "Utility"
+]
+
+# Built‐in catalog of known audio/music apps:
+#   uid -> (Name, Category, Short description, apt package, launch command)
+BUILTIN_APPS = {
+    "ardour":       ("Ardour",         "DAW",           "Professional DAW",              "ardour",        "ardour"),
+    "lmms":         ("LMMS",           "DAW",           "Pattern-based music creation", "lmms",          "lmms"),
+    "qtractor":     ("Qtractor",       "DAW",           "JACK-centric sequencer",        "qtractor",      "qtractor"),
+    "rosegarden":   ("Rosegarden",     "DAW",           "MIDI & notation editor",       "rosegarden",    "rosegarden"),
+    "musescore":    ("MuseScore",      "Editor",        "Music notation software",      "musescore3",    "musescore3"),
+    "audacity":     ("Audacity",       "Editor",        "Audio editor",                 "audacity",      "audacity"),
+    "jackd2":       ("JACK2",          "Server",        "Low-latency audio server",      "jackd2",        "jackd"),
+    "pipewire":     ("PipeWire",       "Server",        "Modern audio server",          "pipewire",      "pipewire"),
+    "pulseaudio":   ("PulseAudio",     "Server",        "Sound server",                 "pulseaudio",    "pulseaudio"),
+    "hydrogen":     ("Hydrogen",       "Synthesizer",   "Advanced drum machine",        "hydrogen",      "hydrogen"),
+    "fluidsynth":   ("FluidSynth",     "Synthesizer",   "SoundFont software synth",     "fluidsynth",    "fluidsynth"),
+    "qsynth":       ("Qsynth",         "Synthesizer",   "GUI for FluidSynth",           "qsynth",        "qsynth"),
+    "carla":        ("Carla",          "Plugin Host",   "VST/LV2 plugin host",          "carla",         "carla"),
+    "sooperlooper": ("SooperLooper",   "Looper",        "Live looping tool",            "sooperlooper",  "sooperlooper"),
+    "mixxx":        ("Mixxx",          "DJ",            "DJ mixing software",           "mixxx",         "mixxx"),
+    "patchage":     ("Patchage",       "Patchbay",      "LV2/JACK patchbay",            "patchage",      "patchage"),
+    "cadence":      ("Cadence",        "Suite",         "KXStudio tools suite",         "cadence",       "cadence"),
+    "ffmpeg":       ("FFmpeg",         "Utility",       "Multimedia framework",         "ffmpeg",        "ffmpeg"),
+    "sox":          ("SoX",            "Utility",       "Sound processing toolkit",     "sox",           "sox"),
+    "ecasound":     ("Ecasound",       "Utility",       "Multitrack audio recorder",    "ecasound",      "ecasound"),
+    "alsa-utils":   ("ALSA Utils",     "Utility",       "Mixer & MIDI tools",           "alsa-utils",    "alsamixer"),
+}
+
+
+# -------------------------------------------------------------------
+# Timing instrumentation
+# -------------------------------------------------------------------
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        thread = threading.current_thread()
+        self.tracer.events.append((self.name, self.category, self.start, end - self.start,
+                                   thread.native_id, thread.name, self.args))
+        return False
+
+
+class _NullSpan:
+    """Returned while tracing is off: entering and leaving it does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Records timing spans into a ring buffer of TRACE_CAPACITY events.
+    While `enabled` is False, span() hands out a shared no-op context,
+    so instrumented code pays one attribute check per span.
+    """
+
+    def __init__(self, capacity=TRACE_CAPACITY):
+        self.enabled = False
+        self.events = deque(maxlen=capacity)  # appends are thread-safe
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name, category="app", args=None):
+        """Context manager timing a block, e.g. `with tracer.span("load"):`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def clear(self):
+        self.events.clear()
+
+    def summary(self) -> list:
+        """[(name, category, count, total ms, max ms)], slowest total first."""
+        totals = {}
+        for name, category, _start, duration, *_rest in list(self.events):
+            count, total, longest = totals.get((name, category), (0, 0, 0))
+            totals[(name, category)] = (count + 1, total + duration, max(longest, duration))
+        rows = [(name, category, count, total / 1e6, longest / 1e6)
+                for (name, category), (count, total, longest) in totals.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def chrome_trace(self) -> dict:
+        """The recorded spans in Chrome's trace event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events, threads = [], {}
+        for name, category, start, duration, tid, thread, args in list(self.events):
+            threads[tid] = thread
+            event = {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": (start - self._origin) / 1000, "dur": duration / 1000}
+            if args:
+                event["args"] = args
+            events.append(event)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                     "args": {"name": thread}} for tid, thread in threads.items()]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        """Write the Chrome trace to `path`; raises OSError on failure."""
+        Path(path).write_text(json.dumps(self.chrome_trace()), encoding="utf-8")
+
+
+def traced(category="app"):
+    """Decorator recording a span named after the function for every call."""
+    def decorate(func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Span(tracer, name, category, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+tracer = Tracer()
+if os.environ.get(TRACE_ENV):
+    tracer.enabled = True
+    if os.environ[TRACE_ENV] != "1":
+        atexit.register(tracer.export, os.environ[TRACE_ENV])
+
+
+class AppEntry:
+    """
+    Represents one audio/music application in our catalog:
+      - uid         : unique identifier
+      - name        : display name
+      - category    : one of CATEGORIES
+      - description : short text
+      - pkg         : Debian package name
+      - cmd         : shell command to launch
+      - custom      : True if user‐added
+      - installed   : None until probed, then True/False
+      - desired     : user selection for install/remove
+      - version     : candidate version (imported entries only)
+      - installed_size : size in KiB once installed (imported entries only)
+    """
+
+    def __init__(self, uid, name, category, description, pkg, cmd, custom=False):
+        self.uid = uid
+        self.name = name
+        self.category = category
+        self.description = description
+        self.pkg = pkg
+        self.cmd = cmd
+        self.custom = custom
+        self.installed = None
+        self.desired = False
+        self.version = ""
+        self.installed_size = 0
+
+
+class SearchIndex:
+    """
+    Incremental search index over the catalog's name, description,
+    package and category:
+      - terms of 3+ characters are looked up by trigram, then checked
+        against the entry text (substring match)
+      - shorter terms match the start of any word
+    Entries can be added or removed one at a time. After `reset`, the
+    entries are indexed by `flush` (the GUI calls it in idle slices) or,
+    at the latest, on the first search.
+    """
+
+    def __init__(self):
+        self._keys = {}        # trigram or "^" + word prefix -> set(uid)
+        self._docs = {}        # uid -> (text, keys)
+        self._pending = {}     # uid -> AppEntry not indexed yet
+        self._categories = {}  # category -> set(uid)
+
+    def reset(self, entries):
+        """Drop everything and schedule `entries` for indexing."""
+        self._keys.clear()
+        self._docs.clear()
+        self._categories.clear()
+        self._pending = {entry.uid: entry for entry in entries}
+        for entry in entries:
+            self._categories.setdefault(entry.category, set()).add(entry.uid)
+
+    def add(self, entry):
+        self.remove(entry.uid)
+        self._pending[entry.uid] = entry
+        self._categories.setdefault(entry.category, set()).add(entry.uid)
+
+    def remove(self, uid):
+        self._pending.pop(uid, None)
+        doc = self._docs.pop(uid, None)
+        if doc is not None:
+            for key in doc[1]:
+                self._keys[key].discard(uid)
+        for uids in self._categories.values():
+            uids.discard(uid)
+
+    def with_category(self, category) -> set:
+        return self._categories.get(category, set())
+
+    def search(self, query, complete=True):
+        """
+        Return the set of matching uids, or None for an empty query. With
+        `complete` False, entries not indexed yet are left out rather than
+        indexed now (the GUI searches again once `flush` is done).
+        """
+        terms = query.lower().split()
+        if not terms:
+            return None
+        if complete:
+            self.flush()
+        # Intersect the keys of every term first (smallest set first), then
+        # confirm only the survivors: a term of up to 3 characters is one
+        # key and needs no check, longer ones must appear as a substring
+        keys, long_terms = [], []
+        for term in terms:
+            if len(term) < 3:
+                keys.append(self._keys.get("^" + term, set()))
+            else:
+                keys.extend(self._keys.get(term[i:i + 3], set()) for i in range(len(term) - 2))
+                if len(term) > 3:
+                    long_terms.append(term)
+        keys.sort(key=len)
+        result = keys[0].intersection(*keys[1:])
+        if long_terms:
+            result = {uid for uid in result
+                      if all(term in self._docs[uid][0] for term in long_terms)}
+        return result
+
+    def flush(self, budget=None) -> bool:
+        """
+        Index the pending entries, for at most `budget` seconds if given.
+        Return True if some are still pending.
+        """
+        deadline = None if budget is None else time.monotonic() + budget
+        pending = self._pending
+        while pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return True
+            for uid in list(itertools.islice(pending, 64)):
+                self._index(pending.pop(uid))
+        return False
+
+    def _index(self, entry):
+        text = " ".join((entry.name, entry.description,
+                         entry.pkg, entry.category)).lower()
+        keys = {text[i:i + 3] for i in range(len(text) - 2)}
+        for word in re.findall(r"\w+", text):
+            keys.add("^" + word[:1])
+            keys.add("^" + word[:2])
+        for key in keys:
+            self._keys.setdefault(key, set()).add(entry.uid)
+        self._docs[entry.uid] = (text, keys)
+
+
+class LaunchProfile:
+    """
+    How an application is scheduled when launched:
+      - nice        : nice level (-20..19), None to inherit ours
+      - rt_priority : SCHED_FIFO priority (1..99), 0 for normal scheduling
+      - cpus        : CPU numbers to pin the process to (empty = any CPU)
+      - io_class    : "realtime", "best-effort", "idle" or None to inherit
+      - io_priority : 0 (highest) .. 7 within the I/O class
+      - env         : extra environment, e.g. {"PIPEWIRE_QUANTUM": "128/48000"}
+    """
+
+    IO_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+
+    def __init__(self, nice=None, rt_priority=0, cpus=(), io_class=None,
+                 io_priority=4, env=None):
+        self.nice = nice
+        self.rt_priority = rt_priority
+        self.cpus = sorted(set(cpus))
+        self.io_class = io_class
+        self.io_priority = io_priority
+        self.env = dict(env or {})
+
+    def to_dict(self) -> dict:
+        return {"nice": self.nice, "rt_priority": self.rt_priority, "cpus": self.cpus,
+                "io_class": self.io_class, "io_priority": self.io_priority, "env": self.env}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: v for k, v in data.items() if k in cls().to_dict()})
+
+    def wrap(self, argv):
+        """
+        Prefix `argv` with chrt/taskset/ionice/nice so the settings hold from
+        exec onwards, for every thread. Requests beyond our rlimits are
+        clamped or dropped, and so is a setting whose tool is not installed;
+        returns (argv, [warnings]).
+        """
+        prefix, warnings = [], []
+        root = os.geteuid() == 0
+
+        def add(tool, setting, *args):
+            if shutil.which(tool) is None:
+                warnings.append(f"{tool} not found, {setting} skipped")
+            else:
+                prefix.extend([tool, *args])
+
+        if self.rt_priority:
+            limit = 99 if root else _rlimit(resource.RLIMIT_RTPRIO, 99)
+            if limit <= 0:
+                warnings.append("real-time scheduling not allowed (RLIMIT_RTPRIO is 0)")
+            else:
+                prio = min(self.rt_priority, limit)
+                if prio < self.rt_priority:
+                    warnings.append(f"real-time priority lowered to {prio} (RLIMIT_RTPRIO)")
+                add("chrt", "real-time priority", "-f", str(prio))
+        if self.cpus:
+            add("taskset", "CPU pinning", "-c", ",".join(map(str, self.cpus)))
+        if self.io_class:
+            io_class = self.io_class
+            if io_class == "realtime" and not root:
+                warnings.append("real-time I/O class needs root; using best-effort")
+                io_class = "best-effort"
+            level = [] if io_class == "idle" else ["-n", str(self.io_priority)]
+            add("ionice", "I/O class", "-c", str(self.IO_CLASSES[io_class]), *level)
+        if self.nice is not None:
+            lowest = -20 if root else 20 - _rlimit(resource.RLIMIT_NICE, 40)
+            nice = max(self.nice, lowest)
+            if nice > self.nice:
+                warnings.append(f"nice level raised to {nice} (RLIMIT_NICE)")
+            add("nice", "nice level", "-n", str(nice - os.nice(0)))
+
+        return prefix + list(argv), warnings
+
+    def environ(self):
+        """Environment for the child, or None to inherit ours unchanged."""
+        if not self.env:
+            return None
+        env = dict(os.environ)
+        env.update(self.env)
+        return env
+
+
+def _rlimit(which, unlimited) -> int:
+    soft, _hard = resource.getrlimit(which)
+    return unlimited if soft == resource.RLIM_INFINITY else min(soft, unlimited)
+
+
+class CustomStore:
+    """
+    SQLite store for user data: custom catalog entries, the launch
+    profiles of any entry and named studio sessions. Every change is a
+    single-row statement committed in its own transaction (WAL journal),
+    so a crash never leaves a half-written catalog. The database is only
+    opened when first needed; a legacy pipe-delimited apps.custom is
+    imported at that point and renamed to apps.custom.imported.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS apps (
+            uid         TEXT PRIMARY KEY,
+            name        TEXT NOT NULL,
+            category    TEXT NOT NULL,
+            description TEXT NOT NULL,
+            pkg         TEXT NOT NULL,
+            cmd         TEXT NOT NULL
+        )"""
+    COLUMNS = "uid, name, category, description, pkg, cmd"
+    PROFILES_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            uid     TEXT PRIMARY KEY,
+            profile TEXT NOT NULL
+        )"""
+    SESSIONS_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            name    TEXT PRIMARY KEY,
+            session TEXT NOT NULL
+        )"""
+
+    def __init__(self, path, legacy_file=None):
+        self.path = path
+        self.legacy_file = legacy_file
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self.SCHEMA)
+            conn.execute(self.PROFILES_SCHEMA)
+            conn.execute(self.SESSIONS_SCHEMA)
+            self._conn = conn
+            self._import_legacy()
+        return self._conn
+
+    def _import_legacy(self):
+        """Move entries from a legacy apps.custom file into the database."""
+        if self.legacy_file is None or not self.legacy_file.exists():
+            return
+        rows = []
+        for line in self.legacy_file.read_text(encoding="utf-8").splitlines():
+            parts = line.split("|")
+            if len(parts) >= 6:
+                # Extra fields come from a '|' inside the description
+                rows.append(parts[:3] + ["|".join(parts[3:-2])] + parts[-2:])
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO apps ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.legacy_file.rename(self.legacy_file.with_name(self.legacy_file.name + ".imported"))
+
+    def _empty(self) -> bool:
+        """True if nothing was ever stored (so no database needs creating)."""
+        return self._conn is None and not self.path.exists() and not (
+            self.legacy_file is not None and self.legacy_file.exists())
+
+    def entries(self):
+        """Yield the custom AppEntry objects, streamed from the database."""
+        if self._empty():
+            return
+        for row in self._db().execute(f"SELECT {self.COLUMNS} FROM apps"):
+            yield AppEntry(*row, custom=True)
+
+    def profiles(self) -> dict:
+        """Return every stored {uid: LaunchProfile}."""
+        if self._empty():
+            return {}
+        return {uid: LaunchProfile.from_dict(json.loads(data))
+                for uid, data in self._db().execute("SELECT uid, profile FROM profiles")}
+
+    def save_profile(self, uid, profile):
+        with self._db() as db:
+            db.execute("INSERT OR REPLACE INTO profiles (uid, profile) VALUES (?, ?)",
+                       (uid, json.dumps(profile.to_dict())))
+
+    def delete_profile(self, uid):
+        with self._db() as db:
+            db.execute("DELETE FROM profiles WHERE uid = ?", (uid,))
+
+    def session_names(self) -> list:
+        if self._empty():
+            return []
+        return [name for name, in self._db().execute("SELECT name FROM sessions ORDER BY name")]
+
+    def session(self, name):
+        """Return the named StudioSession, or None."""
+        if self._empty():
+            return None
+        row = self._db().execute("SELECT session FROM sessions WHERE name = ?", (name,)).fetchone()
+        return StudioSession.from_dict(name, json.loads(row[0])) if row else None
+
+    def save_session(self, session):
+        with self._db() as db:
+            db.execute("INSERT OR REPLACE INTO sessions (name, session) VALUES (?, ?)",
+                       (session.name, json.dumps(session.to_dict())))
+
+    def delete_session(self, name):
+        with self._db() as db:
+            db.execute("DELETE FROM sessions WHERE name = ?", (name,))
+
+    @staticmethod
+    def _values(entry):
+        return (entry.uid, entry.name, entry.category,
+                entry.description, entry.pkg, entry.cmd)
+
+    def insert(self, entry):
+        with self._db() as db:
+            db.execute(f"INSERT INTO apps ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                       self._values(entry))
+
+    def update(self, entry):
+        with self._db() as db:
+            db.execute("UPDATE apps SET name = ?, category = ?, description = ?, "
+                       "pkg = ?, cmd = ? WHERE uid = ?",
+                       self._values(entry)[1:] + (entry.uid,))
+
+    def delete(self, uid):
+        with self._db() as db:
+            db.execute("DELETE FROM apps WHERE uid = ?", (uid,))
+
+    def replace_all(self, entries):
+        """Replace every stored entry with `entries` in one transaction."""
+        with self._db() as db:
+            db.execute("DELETE FROM apps")
+            db.executemany(f"INSERT INTO apps ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                           [self._values(entry) for entry in entries])
+
+
+# Global in‐memory catalog: uid -> AppEntry
+apps = {}
+
+# Persistent store of the user's custom entries and launch profiles
+custom_store = CustomStore(CUSTOM_DB, CUSTOM_FILE)
+
+# Launch profiles by uid, loaded with the catalog
+launch_profiles = {}
+
+# Search index kept in step with `apps`
+search_index = SearchIndex()
+
+
+# -------------------------------------------------------------------
+# System utility functions
+# -------------------------------------------------------------------
+
+def run_cmd(*cmd, check=False):
+    """Run a subprocess command, capture output silently."""
+    with tracer.span(cmd[0], "subprocess", {"argv": cmd}):
+        return subprocess.run(cmd, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, check=check)
+
+
+def is_installed(pkg: str) -> bool:
+    """Return True if Debian package ‘pkg’ is currently installed."""
+    return pkg in installed_packages([pkg])
+
+
+def _is_installed_status(status) -> bool:
+    """
+    True for a dpkg Status of "<want> <flag> installed": "install ok
+    installed", but also held packages ("hold ok installed").
+    """
+    return status.split()[2:3] == ["installed"]
+
+
+def _parse_dpkg_status(path, wanted):
+    """
+    Stream the dpkg status database one stanza at a time and return
+    the subset of `wanted` package names that are installed.
+    """
+    found = set()
+    pkg = status = None
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            if line.startswith("Package:"):
+                pkg = line[8:].strip()
+            elif line.startswith("Status:"):
+                status = line[7:].strip()
+            elif line == "\n":
+                if pkg in wanted and status and _is_installed_status(status):
+                    found.add(pkg)
+                pkg = status = None
+    if pkg in wanted and status and _is_installed_status(status):
+        found.add(pkg)
+    return found
+
+
+def _query_dpkg_status(wanted):
+    """Fallback: ask dpkg-query about all `wanted` packages in one call."""
+    # dpkg-query exits non-zero when some names are unknown but still
+    # prints the ones it found, so the return code is ignored.
+    result = run_cmd("dpkg-query", "-W", "-f=${Package}\t${Status}\n", *sorted(wanted))
+    found = set()
+    for line in result.stdout.decode(errors="replace").splitlines():
+        pkg, _, status = line.partition("\t")
+        if _is_installed_status(status):
+            found.add(pkg)
+    return found
+
+
+def dpkg_db_stamp():
+    """
+    Return a fingerprint of the dpkg database, or None if it cannot be read.
+
+    dpkg replaces the status file (new inode, mtime and size) at the end of
+    every transaction, and records in-flight changes under updates/, so any
+    apt/dpkg run — from this app or elsewhere — changes the stamp.
+    """
+    try:
+        st = DPKG_STATUS.stat()
+        up = DPKG_UPDATES.stat()
+    except OSError:
+        return None
+    return [st.st_ino, st.st_size, st.st_mtime_ns, up.st_mtime_ns]
+
+
+def _read_status_cache(stamp):
+    """Return the cached {pkg: installed} map if it matches `stamp`."""
+    try:
+        data = json.loads(STATUS_CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if (not isinstance(data, dict) or data.get("stamp") != stamp
+            or data.get("version") != STATUS_CACHE_VERSION):
+        return {}
+    status = data.get("status")
+    return status if isinstance(status, dict) else {}
+
+
+def _write_json_atomic(path, data):
+    """Atomically replace a JSON cache file; failures are ignored."""
+    import tempfile  # pulls in random: only when a cache changes
+    try:
+        # A private temporary file: other threads or processes may be
+        # writing the same cache
+        fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(json.dumps(data))
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _write_status_cache(stamp, status):
+    _write_json_atomic(STATUS_CACHE_FILE, {"version": STATUS_CACHE_VERSION,
+                                           "stamp": stamp, "status": status})
+
+
+@traced("status")
+def _probe_installed(wanted):
+    """Return the installed subset of bare package names `wanted`."""
+    try:
+        updates_pending = any(DPKG_UPDATES.iterdir())
+    except OSError:
+        updates_pending = False
+    # Only dpkg-query merges the journal of an unfinished transaction
+    if not updates_pending:
+        try:
+            return _parse_dpkg_status(DPKG_STATUS, wanted)
+        except OSError:
+            pass
+    return _query_dpkg_status(wanted)
+
+
+_status_lock = threading.Lock()
+
+
+@traced("status")
+def installed_packages(pkgs, use_cache=True) -> set:
+    """
+    Return the set of names in `pkgs` that are currently installed.
+
+    Reads the dpkg status database directly (no subprocess); falls back
+    to a single multi-package dpkg-query if the database is unreadable.
+    Architecture qualifiers ("pkg:amd64") are matched on the bare name.
+
+    With `use_cache`, answers are served from STATUS_CACHE_FILE as long
+    as the dpkg database is unchanged, and only unknown names are probed.
+    """
+    names = {}
+    for pkg in pkgs:
+        names[pkg] = pkg.split(":", 1)[0]
+    wanted = set(names.values())
+    if not wanted:
+        return set()
+
+    # Read, probe and write back under one lock, so concurrent callers
+    # (the GUI's status probe and archive import) do not drop each
+    # other's answers
+    with _status_lock:
+        stamp = dpkg_db_stamp() if use_cache else None
+        status = _read_status_cache(stamp) if stamp is not None else {}
+        missing = wanted - status.keys()
+        if missing:
+            found = _probe_installed(missing)
+            for pkg in missing:
+                status[pkg] = pkg in found
+            if stamp is not None and CONFIG_DIR.is_dir():
+                _write_status_cache(stamp, status)
+    return {pkg for pkg, bare in names.items() if status[bare]}
+
+
+def _dependency_names(value):
+    """
+    Split a Depends-style field into clauses of bare package names:
+    "a (>= 1) | b:any, c" -> [["a", "b"], ["c"]]. Versions are ignored.
+    """
+    clauses = []
+    for clause in value.split(","):
+        names = [alt.split("(", 1)[0].strip().split(":", 1)[0] for alt in clause.split("|")]
+        names = [name for name in names if name]
+        if names:
+            clauses.append(names)
+    return clauses
+
+
+class DependencyGraph:
+    """
+    Dependencies between installed packages, from one streaming parse of
+    the dpkg status database:
+      - depends   : {pkg: [[alternative, ...], ...]} (Depends and Pre-Depends)
+      - provides  : {pkg: {virtual package names it provides}}
+      - providers : {name: {installed packages that are or provide it}}
+      - rdeps     : {name: {installed packages with a clause naming it}}
+    """
+
+    def __init__(self, stamp=None):
+        self.stamp = stamp
+        self.depends = {}
+        self.provides = {}
+        self.providers = {}
+        self.rdeps = {}
+
+    @classmethod
+    @traced("status")
+    def from_status(cls, path, stamp=None):
+        graph = cls(stamp)
+        fields = {}
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                if line == "\n":
+                    graph._add(fields)
+                    fields = {}
+                elif line[:1] not in (" ", "\t"):
+                    key, _, value = line.partition(":")
+                    if key in ("Package", "Status", "Depends", "Pre-Depends", "Provides"):
+                        fields[key] = value.strip()
+        graph._add(fields)
+        return graph
+
+    def _add(self, fields):
+        pkg = fields.get("Package")
+        if not pkg or not _is_installed_status(fields.get("Status", "")):
+            return
+        # Multi-Arch: same packages have one stanza per architecture
+        clauses = self.depends.setdefault(pkg, [])
+        for key in ("Pre-Depends", "Depends"):
+            for names in _dependency_names(fields.get(key, "")):
+                if names not in clauses:
+                    clauses.append(names)
+                for name in names:
+                    self.rdeps.setdefault(name, set()).add(pkg)
+        self.providers.setdefault(pkg, set()).add(pkg)
+        for names in _dependency_names(fields.get("Provides", "")):
+            self.provides.setdefault(pkg, set()).add(names[0])
+            self.providers.setdefault(names[0], set()).add(pkg)
+
+    def dependents(self, pkgs) -> list:
+        """
+        Return the installed packages that would lose a dependency, directly
+        or through another such package, if `pkgs` were removed: those apt
+        removes as well. Only the reverse edges of removed packages are
+        visited, so this is instant even on large systems.
+        """
+        removed = {pkg.split(":", 1)[0] for pkg in pkgs}
+        todo = list(removed)
+        found = set()
+        while todo:
+            pkg = todo.pop()
+            # Dependents of pkg itself and of the virtual packages it provides
+            for name in [pkg, *self.provides.get(pkg, ())]:
+                for dependent in self.rdeps.get(name, ()):
+                    if dependent in removed or not self._broken(dependent, removed):
+                        continue
+                    removed.add(dependent)
+                    found.add(dependent)
+                    todo.append(dependent)
+        return sorted(found)
+
+    def _broken(self, pkg, removed) -> bool:
+        """
+        True if some dependency clause of `pkg` is met now but only by
+        `removed` packages (clauses already unmet are dpkg's business).
+        """
+        for names in self.depends.get(pkg, ()):
+            providers = set().union(*(self.providers.get(name, ()) for name in names))
+            if providers and providers <= removed:
+                return True
+        return False
+
+
+_dependency_graph = DependencyGraph()
+
+
+def dependency_graph() -> DependencyGraph:
+    """
+    Return the DependencyGraph of the installed system, parsing the dpkg
+    status database again only when dpkg_db_stamp() has changed.
+    """
+    global _dependency_graph
+    stamp = dpkg_db_stamp()
+    if stamp is None or stamp != _dependency_graph.stamp:
+        try:
+            _dependency_graph = DependencyGraph.from_status(DPKG_STATUS, stamp)
+        except OSError:
+            _dependency_graph = DependencyGraph()
+    return _dependency_graph
+
+
+class RemovalImpact:
+    """
+    What else a removal takes down, from the dependency graph:
+      - packages : installed packages that depend on the removed ones
+      - entries  : catalog apps among them (AppEntry objects)
+    """
+
+    def __init__(self, packages=(), entries=()):
+        self.packages = list(packages)
+        self.entries = list(entries)
+
+    def to_dict(self) -> dict:
+        return {"packages": self.packages, "apps": [e.uid for e in self.entries]}
+
+    def describe(self) -> str:
+        """One-paragraph summary for the Remove dialog and the CLI prompt."""
+        if not self.packages:
+            return "No other installed package depends on these."
+        text = f"Also removes {len(self.packages)} dependent package(s): " + ", ".join(self.packages)
+        if self.entries:
+            text += "; catalog apps affected: " + ", ".join(e.name for e in self.entries)
+        return text
+
+
+def removal_impact(pkgs) -> RemovalImpact:
+    """Return the RemovalImpact of removing (or purging) `pkgs`."""
+    packages = dependency_graph().dependents(pkgs)
+    wanted = set(packages)
+    entries = sorted((e for e in apps.values() if e.pkg.split(":", 1)[0] in wanted),
+                     key=lambda e: e.name.lower())
+    return RemovalImpact(packages, entries)
+
+
+def load_settings() -> dict:
+    """Return DEFAULT_SETTINGS updated with the user's SETTINGS_FILE."""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        data = json.loads(SETTINGS_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return settings
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key not in DEFAULT_SETTINGS or _valid_setting(key, value):
+                settings[key] = value
+    return settings
+
+
+def _valid_setting(key, value) -> bool:
+    """True if `value` fits `key`; invalid user values fall back to the default."""
+    if key in SETTING_CHOICES:
+        return any(value == choice and type(value) is type(choice)
+                   for choice in SETTING_CHOICES[key])
+    default = DEFAULT_SETTINGS[key]
+    if isinstance(default, bool):
+        return isinstance(value, bool)
+    if isinstance(default, (int, float)):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+    if isinstance(default, list):
+        return isinstance(value, list) and all(isinstance(item, str) for item in value)
+    return isinstance(value, type(default))
+
+
+# Set once `apt-get update` has succeeded during this run
+_session_updated = False
+
+
+def apt_lists_age() -> float:
+    """
+    Seconds since the apt indexes were last refreshed, or infinity if
+    there are none. Uses the newest list file, or our own stamp if later:
+    apt keeps the old mtime of lists the mirror reports as unchanged.
+    """
+    newest = 0.0
+    try:
+        with os.scandir(APT_LISTS_DIR) as it:
+            for de in it:
+                if de.is_file() and de.name != "lock":
+                    newest = max(newest, de.stat().st_mtime)
+    except OSError:
+        pass
+    if not newest:
+        return float("inf")
+    try:
+        newest = max(newest, APT_UPDATE_STAMP.stat().st_mtime)
+    except OSError:
+        pass
+    return time.time() - newest
+
+
+def apt_lists_stale() -> bool:
+    """Return True if `apt-get update` should run before an install."""
+    settings = load_settings()
+    policy = settings["update_policy"]
+    if policy == "always":
+        return True
+    if policy == "session":
+        return not _session_updated
+    return apt_lists_age() > float(settings["update_max_age"])
+
+
+def mark_apt_updated():
+    """Record a successful `apt-get update` for the freshness policy."""
+    global _session_updated
+    _session_updated = True
+    try:
+        APT_UPDATE_STAMP.touch()
+    except OSError:
+        pass
+
+
+def is_apt_update(cmd) -> bool:
+    """Return True if `cmd` is an `apt-get update` invocation."""
+    return "apt-get" in cmd and cmd[cmd.index("apt-get") + 1:][:1] == ["update"]
+
+
+def is_archive_copy(cmd) -> bool:
+    """
+    Return True if `cmd` puts prefetched archives into apt's cache; it is
+    best effort, as apt downloads whatever did not make it.
+    """
+    return "cp" in cmd and cmd[-1] == f"{APT_ARCHIVES_DIR}/"
+
+
+def apt_install_cmds(pkgs: list) -> list:
+    """Commands that install packages via apt-get, refreshing stale indexes."""
+    cmds = []
+    if apt_lists_stale():
+        cmds.append(["sudo", "apt-get", "update", "-qq"])
+    cmds.append(["sudo", "apt-get", "install", "-y", *pkgs])
+    return cmds
+
+
+def apt_remove_cmds(pkgs: list) -> list:
+    """Commands that remove packages (leave config files)."""
+    return [["sudo", "apt-get", "remove", "-y", *pkgs]]
+
+
+def apt_purge_cmds(pkgs: list) -> list:
+    """Commands that purge packages (delete config files)."""
+    return [["sudo", "apt-get", "purge", "-y", *pkgs]]
+
+
+def apt_install(pkgs: list):
+    """Install packages via apt-get."""
+    for cmd in apt_install_cmds(pkgs):
+        run_cmd(*cmd, check=True)
+        if is_apt_update(cmd):
+            mark_apt_updated()
+
+
+def apt_remove(pkgs: list):
+    """Remove packages (leave config files)."""
+    for cmd in apt_remove_cmds(pkgs):
+        run_cmd(*cmd, check=True)
+
+
+def apt_purge(pkgs: list):
+    """Purge packages (delete config files)."""
+    for cmd in apt_purge_cmds(pkgs):
+        run_cmd(*cmd, check=True)
+
+
+class TransactionPlan:
+    """
+    All pending package changes, merged so that apt resolves and dpkg
+    applies them in a single run:
+      - install : packages to install
+      - remove  : packages to remove, keeping their config files
+      - purge   : packages to remove together with their config files
+
+    Archives already downloaded for the installs (`prefetched`) are put
+    into apt's cache first, so apt only has to unpack and configure.
+    `update` forces the index refresh on or off; None applies the
+    update policy.
+    """
+
+    def __init__(self, install=(), remove=(), purge=(), prefetched=(), update=None):
+        self.install = sorted(set(install))
+        self.purge = sorted(set(purge))
+        self.remove = sorted(set(remove) - set(self.purge))
+        self.prefetched = [str(path) for path in prefetched]
+        self.update = update
+
+    def needs_update(self) -> bool:
+        return bool(self.install) and (apt_lists_stale() if self.update is None else self.update)
+
+    def is_empty(self) -> bool:
+        return not (self.install or self.remove or self.purge)
+
+    def cmds(self, sudo=True) -> list:
+        """
+        Commands realising the plan: an optional index refresh, then one
+        `apt-get install` using the "pkg-" suffix for removals. apt can only
+        purge all removals or none, so with a mix of remove and purge the
+        leftover config files are purged by dpkg afterwards (no solver run).
+        Without `sudo` the commands are for a process that is already root.
+        """
+        if self.is_empty():
+            return []
+        prefix = ["sudo"] if sudo else []
+        cmds = []
+        if self.needs_update():
+            cmds.append(prefix + ["apt-get", "update", "-qq"])
+        if self.install and self.prefetched:
+            cmds.append(prefix + ["cp", "--", *self.prefetched, f"{APT_ARCHIVES_DIR}/"])
+        purge_all = bool(self.purge) and not self.remove
+        cmd = prefix + ["apt-get", "install", "-y"]
+        if purge_all:
+            cmd.append("--purge")
+        cmd += self.install
+        cmd += [pkg + "-" for pkg in self.remove + self.purge]
+        cmds.append(cmd)
+        if self.purge and not purge_all:
+            cmds.append(prefix + ["dpkg", "--purge", *self.purge])
+        return cmds
+
+    def describe(self) -> str:
+        """Human-readable summary for the confirmation dialog."""
+        parts = []
+        for title, pkgs in (("Install", self.install), ("Remove", self.remove),
+                            ("Purge", self.purge)):
+            if pkgs:
+                parts.append(f"{title}: " + ", ".join(pkgs))
+        return "\n".join(parts)
+
+
+class PlanEstimate:
+    """
+    What apt would do for a TransactionPlan, from `apt-get -s`:
+      - download      : bytes still to download (None if not reported)
+      - disk          : bytes of disk space used (negative when freed)
+      - extra_install : packages apt adds to satisfy dependencies
+      - extra_remove  : packages apt removes as well
+      - error         : apt's error message if the plan cannot be applied
+    """
+
+    def __init__(self, download=None, disk=None, extra_install=(), extra_remove=(), error=""):
+        self.download = download
+        self.disk = disk
+        self.extra_install = list(extra_install)
+        self.extra_remove = list(extra_remove)
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {"download": self.download, "disk": self.disk,
+                "extra_install": self.extra_install, "extra_remove": self.extra_remove,
+                "error": self.error}
+
+    def describe(self) -> str:
+        """One-paragraph summary for the Manage page and the CLI prompt."""
+        if self.error:
+            return f"apt cannot apply these changes: {self.error}"
+        parts = []
+        if self.download is not None:
+            parts.append(f"download {format_size(self.download)}")
+        if self.disk is not None:
+            parts.append(f"disk {'+' if self.disk >= 0 else '-'}{format_size(abs(self.disk))}")
+        text = ", ".join(parts) or "size not reported by apt"
+        text = text[0].upper() + text[1:]
+        for title, pkgs in (("also installs", self.extra_install),
+                            ("also removes", self.extra_remove)):
+            if pkgs:
+                text += f"; {title} {len(pkgs)}: " + ", ".join(pkgs)
+        return text
+
+
+_SIZE_UNITS = {"B": 1, "kB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+_NEED_TO_GET = re.compile(r"^Need to get ([\d.,]+) (\w?B)")
+_DISK_DELTA = re.compile(r"^After this operation, ([\d.,]+) (\w?B) .*(used|freed)")
+
+
+def _apt_size(number, unit) -> int:
+    return int(float(number.replace(",", "")) * _SIZE_UNITS.get(unit, 1))
+
+
+def format_size(size) -> str:
+    """Bytes as apt prints them: SI units, one decimal."""
+    for unit in ("TB", "GB", "MB", "kB"):
+        if size >= _SIZE_UNITS[unit]:
+            return f"{size / _SIZE_UNITS[unit]:.1f} {unit}"
+    return f"{size} B"
+
+
+# Simulation results by (pending set, dpkg/apt list stamps), most recent last
+_estimate_cache = {}
+ESTIMATE_CACHE_SIZE = 32
+
+
+def _estimate_key(plan):
+    try:
+        lists = APT_LISTS_DIR.stat().st_mtime_ns
+    except OSError:
+        lists = None
+    return (tuple(plan.install), tuple(plan.remove + plan.purge),
+            str(dpkg_db_stamp()), lists)
+
+
+@traced("apt")
+def estimate_plan(plan, cached_only=False):
+    """
+    Simulate `plan` with `apt-get -s` (no root, no lock) and return a
+    PlanEstimate. Results are cached per pending set until dpkg's database
+    or the apt indexes change, so toggling back to an earlier selection
+    does not run the solver again; with `cached_only`, return None rather
+    than simulate.
+    """
+    key = _estimate_key(plan)
+    if key in _estimate_cache:
+        _estimate_cache[key] = _estimate_cache.pop(key)  # now most recent
+        return _estimate_cache[key]
+    if cached_only:
+        return None
+
+    cmd = ["apt-get", "-s", "install", *plan.install,
+           *[pkg + "-" for pkg in plan.remove + plan.purge]]
+    try:
+        with tracer.span("apt-get", "subprocess", {"argv": cmd}):
+            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  text=True, errors="replace",
+                                  env=dict(os.environ, LC_ALL="C"))
+    except OSError as exc:
+        return PlanEstimate(error=str(exc))  # not cached: nothing was learnt
+    estimate = PlanEstimate()
+    requested = {pkg.split(":", 1)[0] for pkg in plan.install + plan.remove + plan.purge}
+    for line in proc.stdout.splitlines():
+        kind, _, rest = line.partition(" ")
+        name = rest.split(" ", 1)[0].split(":", 1)[0]
+        if kind == "Inst" and name not in requested:
+            estimate.extra_install.append(name)
+        elif kind == "Remv" and name not in requested:
+            estimate.extra_remove.append(name)
+        elif line.startswith("E: ") and not estimate.error:
+            estimate.error = line[3:]
+        elif (m := _NEED_TO_GET.match(line)):
+            estimate.download = _apt_size(*m.groups())
+        elif (m := _DISK_DELTA.match(line)):
+            size = _apt_size(m.group(1), m.group(2))
+            estimate.disk = -size if m.group(3) == "freed" else size
+    if proc.returncode != 0 and not estimate.error:
+        estimate.error = f"apt-get exited with status {proc.returncode}"
+
+    _estimate_cache[key] = estimate
+    while len(_estimate_cache) > ESTIMATE_CACHE_SIZE:
+        del _estimate_cache[next(iter(_estimate_cache))]
+    return estimate
+
+
+class AptTransaction:
+    """
+    Runs a list of apt-get commands in a worker thread and streams
+    apt's machine-readable progress (APT::Status-Fd) back to the caller.
+
+    Callbacks are invoked from the worker thread:
+      - on_progress(fraction, text) : overall progress in [0, 1]
+      - on_line(line)               : one line of regular apt output
+      - on_done(ok, message)        : once, after the last command
+
+    Packages named in dpkg's status lines are collected in `touched`,
+    including dependencies pulled in or removed by apt. A successful
+    index refresh is recorded for the update policy unless
+    `record_update` is False (the privileged helper leaves that to its
+    client).
+
+    Once dpkg starts working (the first pmstatus line) the transaction
+    is `committed`: killing apt then would leave dpkg half done, so
+    `cancel` only skips the commands that have not started yet.
+    """
+
+    # Report status lines on stdout next to the normal output, avoid the
+    # dpkg pty, and keep existing conffiles instead of prompting
+    PROGRESS_OPTS = ["-o", "APT::Status-Fd=1", "-o", "Dpkg::Use-Pty=0",
+                     "-o", "Dpkg::Options::=--force-confdef",
+                     "-o", "Dpkg::Options::=--force-confold"]
+
+    # Wait for a package manager run elsewhere (e.g. unattended-upgrades)
+    # to release the dpkg lock rather than failing at once
+    LOCK_OPTS = ["-o", "DPkg::Lock::Timeout=300"]
+
+    def __init__(self, cmds, on_progress, on_line, on_done, record_update=True):
+        self.cmds = cmds
+        self.record_update = record_update
+        self.on_progress = on_progress
+        self.on_line = on_line
+        self.on_done = on_done
+        self.cancelled = False
+        self.committed = False  # dpkg has started changing the system
+        self.finished = False  # on_done has been called
+        self.touched = set()  # packages dpkg reported working on
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        """
+        Skip the remaining commands, and stop the running one unless dpkg
+        is already at work on it.
+        """
+        with self._lock:
+            self.cancelled = True
+            if not self.committed and self._proc is not None and self._proc.poll() is None:
+                self._proc.terminate()
+
+    def _argv(self, cmd):
+        """Insert the progress options right after 'apt-get'."""
+        if "apt-get" not in cmd:
+            return cmd
+        idx = cmd.index("apt-get") + 1
+        return cmd[:idx] + self.PROGRESS_OPTS + self.LOCK_OPTS + cmd[idx:]
+
+    def _run(self):
+        message = "Transaction failed."
+        try:
+            with tracer.span("transaction", "apt", {"cmds": self.cmds}):
+                self._run_cmds()
+        except Exception as exc:  # e.g. a failing callback
+            message = f"Transaction failed: {exc}"
+            # Keep reading so apt never blocks on a full pipe
+            if self._proc is not None and self._proc.poll() is None:
+                for _ in self._proc.stdout:
+                    pass
+                self._proc.wait()
+        finally:
+            if not self.finished:
+                self._finish(False, message)
+
+    def _finish(self, ok, message):
+        self.finished = True
+        self.on_done(ok, message)
+
+    def _run_cmds(self):
+        total = len(self.cmds)
+        for step, cmd in enumerate(self.cmds):
+            with self._lock:
+                if self.cancelled:
+                    break
+                try:
+                    self._proc = subprocess.Popen(self._argv(cmd),
+                                                  stdin=subprocess.DEVNULL,
+                                                  stdout=subprocess.PIPE,
+                                                  stderr=subprocess.STDOUT,
+                                                  text=True, errors="replace")
+                except OSError as exc:
+                    self._finish(False, f"Cannot run '{cmd[0]}': {exc}")
+                    return
+            self.on_progress(step / total, " ".join(cmd[1:3]))
+            with tracer.span(" ".join(cmd[1:3]), "subprocess", {"argv": cmd}):
+                for line in self._proc.stdout:
+                    self._handle_line(line.rstrip("\n"), step, total)
+                self._proc.wait()
+            if self._proc.returncode != 0 and is_archive_copy(cmd):
+                self.on_line("Some pre-downloaded packages could not be used; "
+                             "apt downloads them again.")
+            elif self._proc.returncode != 0 and not self.cancelled:
+                self._finish(False, f"'{' '.join(cmd)}' failed "
+                                    f"(exit status {self._proc.returncode}).")
+                return
+            if self._proc.returncode == 0 and is_apt_update(cmd) and self.record_update:
+                mark_apt_updated()
+        if self.cancelled:
+            self._finish(False, "Transaction cancelled.")
+        else:
+            self.on_progress(1.0, "Done")
+            self._finish(True, "")
+
+    def _handle_line(self, line, step, total):
+        kind, _, rest = line.partition(":")
+        if kind in ("pmstatus", "dlstatus"):
+            # <kind>:<package>:<percent>:<description>
+            pkg, pct, text = (rest.split(":", 2) + ["", ""])[:3]
+            if kind == "pmstatus":
+                with self._lock:
+                    self.committed = True
+                if pkg:
+                    self.touched.add(pkg.split(":", 1)[0])
+            try:
+                fraction = (step + float(pct) / 100.0) / total
+            except ValueError:
+                return
+            self.on_progress(min(fraction, 1.0), text)
+        elif kind == "pmerror":
+            self.on_line("Error: " + rest)
+        elif kind == "pmconffile":
+            pass
+        elif line:
+            self.on_line(line)
+
+
+class HelperError(Exception):
+    """The privileged helper could not be started or stopped talking."""
+
+
+class HelperClient:
+    """
+    Client side of the privileged helper (helper.py), which is started
+    once, through sudo, and then takes every package transaction of the
+    session over its stdin/stdout: one JSON object per line.
+
+      helper -> client  {"event": "hello", "protocol": 1, ...} on start, then
+                        {"id": n, "event": "queued" | "progress" | "line" | "done", ...}
+                        (progress events carry "committed" once dpkg is at work,
+                        after which a cancel only skips the remaining commands)
+      client -> helper  {"op": "apply", "id": n, "install": [...], "remove": [...],
+                         "purge": [...], "prefetched": [...], "update": bool}
+                        {"op": "cancel", "id": n}
+                        {"op": "shutdown"}
+    """
+
+    def __init__(self, argv=None, fake=False):
+        if argv is None:
+            argv = ([sys.executable, str(HELPER_SCRIPT), "--fake"] if fake
+                    else ["sudo", sys.executable, str(HELPER_SCRIPT)])
+        self.argv = argv
+        self.backend = None
+        self._proc = None
+        self._ids = itertools.count(1)
+        self._pending = {}  # id -> HelperTransaction
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the helper (sudo may ask for a password); raises HelperError."""
+        try:
+            self._proc = subprocess.Popen(self.argv, stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE, text=True, bufsize=1)
+        except OSError as exc:
+            raise HelperError(f"cannot start the helper: {exc}") from exc
+        try:
+            hello = json.loads(self._proc.stdout.readline() or "null")
+        except ValueError:
+            hello = None
+        if not isinstance(hello, dict) or hello.get("event") != "hello":
+            self.close()
+            raise HelperError("the helper did not start")
+        if hello.get("protocol") != HELPER_PROTOCOL:
+            self.close()
+            raise HelperError(f"helper speaks protocol {hello.get('protocol')}, "
+                              f"expected {HELPER_PROTOCOL}")
+        self.backend = hello.get("backend")
+        threading.Thread(target=self._read_events, daemon=True).start()
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def transaction(self, plan, on_progress, on_line, on_done):
+        """An AptTransaction-like object running `plan` in the helper."""
+        return HelperTransaction(self, plan, on_progress, on_line, on_done)
+
+    def close(self):
+        """Ask the helper to finish its queue and exit."""
+        if self._proc is None:
+            return
+        try:
+            self._send({"op": "shutdown"})
+            self._proc.stdin.close()
+        except (OSError, HelperError):
+            pass
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass  # still finishing a transaction; it exits on its own
+
+    def _send(self, message):
+        with self._lock:
+            try:
+                self._proc.stdin.write(json.dumps(message) + "\n")
+                self._proc.stdin.flush()
+            except (OSError, ValueError) as exc:
+                raise HelperError(f"lost the helper: {exc}") from exc
+
+    def _submit(self, transaction):
+        ident = next(self._ids)
+        self._pending[ident] = transaction
+        plan = transaction.plan
+        self._send({"op": "apply", "id": ident, "install": plan.install,
+                    "remove": plan.remove, "purge": plan.purge,
+                    "prefetched": plan.prefetched, "update": plan.needs_update()})
+        return ident
+
+    def _read_events(self):
+        for line in self._proc.stdout:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            transaction = self._pending.get(event.get("id"))
+            if transaction is not None:
+                if event.get("event") == "done":
+                    del self._pending[event["id"]]
+                transaction._handle(event)
+        # The helper is gone: nothing pending will complete
+        for ident in list(self._pending):
+            self._pending.pop(ident)._handle(
+                {"event": "done", "ok": False, "message": "The privileged helper exited."})
+
+
+class HelperTransaction:
+    """Same interface and callbacks as AptTransaction, run by the helper."""
+
+    def __init__(self, client, plan, on_progress, on_line, on_done):
+        self.client = client
+        self.plan = plan
+        self.on_progress = on_progress
+        self.on_line = on_line
+        self.on_done = on_done
+        self.cancelled = False
+        self.committed = False
+        self.touched = set()
+        self._id = None
+
+    def start(self):
+        try:
+            self._id = self.client._submit(self)
+        except HelperError as exc:
+            self.on_done(False, str(exc))
+
+    def cancel(self):
+        self.cancelled = True
+        if self._id is not None:
+            try:
+                self.client._send({"op": "cancel", "id": self._id})
+            except HelperError:
+                pass
+
+    def _handle(self, event):
+        kind = event.get("event")
+        if kind == "queued":
+            self.on_progress(0.0, "Queued")
+        elif kind == "progress":
+            self.committed = self.committed or bool(event.get("committed"))
+            self.on_progress(event["fraction"], event["text"])
+        elif kind == "line":
+            self.on_line(event["line"])
+        elif kind == "done":
+            self.touched = set(event.get("touched", ()))
+            if event.get("updated"):
+                mark_apt_updated()
+            self.on_done(event["ok"], event.get("message", ""))
+
+
+# '<uri>' <file name> <size> <hash kind>:<hex>, as printed by --print-uris
+_PRINT_URIS_LINE = re.compile(r"^'(?P<uri>[^']+)' (?P<name>\S+) (?P<size>\d+) (?P<hash>\S*)")
+
+# apt hash field names -> hashlib algorithms
+_APT_HASHES = {"SHA512": "sha512", "SHA256": "sha256", "SHA1": "sha1", "MD5Sum": "md5"}
+
+
+def apt_print_uris(pkgs) -> list:
+    """
+    Archives apt would download to install `pkgs` (dependencies included,
+    cached ones excluded) as (uri, file name, size, hash) tuples. Needs
+    no root and takes no lock.
+    """
+    cmd = ["apt-get", "install", "--print-uris", "-qq", "-y", *pkgs]
+    with tracer.span("apt-get", "subprocess", {"argv": cmd}):
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True, errors="replace")
+    uris = []
+    for line in proc.stdout.splitlines():
+        m = _PRINT_URIS_LINE.match(line)
+        if m:
+            uris.append((m["uri"], m["name"], int(m["size"]), m["hash"]))
+    return uris
+
+
+def _download(uri, dest, size, checksum, cancelled) -> bool:
+    """
+    Fetch `uri` into `dest` if it matches `size` and `checksum`. Returns
+    False on a mismatch or once the `cancelled` Event is set.
+    """
+    import hashlib
+    import urllib.request  # pulls in http.client and ssl: only when prefetching
+    kind, _, expected = checksum.partition(":")
+    digest = hashlib.new(_APT_HASHES[kind]) if kind in _APT_HASHES else None
+    # Per-thread name: two packages may share a dependency
+    part = dest.with_name(f"{dest.name}.{threading.get_ident()}.part")
+    try:
+        with urllib.request.urlopen(uri, timeout=30) as resp, open(part, "wb") as out:
+            while not cancelled.is_set():
+                chunk = resp.read(1 << 16)
+                if not chunk:
+                    break
+                out.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+        if cancelled.is_set() or part.stat().st_size != size:
+            return False
+        if digest is not None and digest.hexdigest() != expected:
+            return False
+        part.replace(dest)
+        return True
+    finally:
+        part.unlink(missing_ok=True)
+
+
+class Prefetcher:
+    """
+    Downloads, in the background, what apt would fetch to install the
+    packages marked for installation, so that Apply only has to unpack
+    and configure. No root is needed: the URIs come from apt-get
+    --print-uris and the archives are fetched into PREFETCH_DIR, checked
+    against the index hashes, at most `jobs` packages at a time.
+
+    on_change(pkg, state) is called from the worker threads, with state
+    one of "queued", "downloading", "ready", "failed" or "cancelled".
+    """
+
+    # URI schemes fetched here; anything else is left to apt
+    SCHEMES = ("http:", "https:", "ftp:", "file:")
+
+    def __init__(self, jobs=2, on_change=None, directory=PREFETCH_DIR):
+        self.directory = directory
+        self.on_change = on_change or (lambda pkg, state: None)
+        from concurrent.futures import ThreadPoolExecutor  # kept out of CLI startup
+        self.states = {}  # pkg -> last state, while the package is wanted
+        self._pool = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self._lock = threading.Lock()
+        self._jobs = {}   # pkg -> cancel Event
+        self._files = {}  # pkg -> [archive paths], once downloaded
+
+    def fetch(self, pkg):
+        """Start downloading `pkg` (and its missing dependencies)."""
+        with self._lock:
+            if pkg in self._jobs:
+                return
+            cancelled = self._jobs[pkg] = threading.Event()
+            self._set(pkg, "queued")
+        self._pool.submit(self._fetch, pkg, cancelled)
+
+    def drop(self, pkg):
+        """Stop downloading `pkg`; it is no longer marked for install."""
+        with self._lock:
+            cancelled = self._jobs.pop(pkg, None)
+            if cancelled is None:
+                return
+            cancelled.set()
+            self._files.pop(pkg, None)
+            self.states.pop(pkg, None)
+        self.on_change(pkg, "cancelled")
+
+    def cancel(self):
+        """Stop every download, e.g. once apt takes over."""
+        for pkg in list(self._jobs):
+            self.drop(pkg)
+
+    def ready_files(self, pkgs) -> list:
+        """Downloaded archives for those of `pkgs` that are complete."""
+        with self._lock:
+            files = {path for pkg in pkgs for path in self._files.get(pkg, ())}
+        return sorted(path for path in files if path.exists())
+
+    def clear(self):
+        """Cancel everything and delete the downloaded archives."""
+        self.cancel()
+        if self.directory.is_dir():
+            for path in self.directory.iterdir():
+                path.unlink(missing_ok=True)
+
+    def _set(self, pkg, state):
+        self.states[pkg] = state
+        self.on_change(pkg, state)
+
+    def _fetch(self, pkg, cancelled):
+        if cancelled.is_set():
+            return
+        with self._lock:
+            if not cancelled.is_set():
+                self._set(pkg, "downloading")
+        files, ok = [], True
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for uri, name, size, checksum in apt_print_uris([pkg]):
+                dest = self.directory / name
+                if not uri.startswith(self.SCHEMES):
+                    continue
+                if not dest.exists() and not _download(uri, dest, size, checksum, cancelled):
+                    ok = False
+                    break
+                files.append(dest)
+        except (OSError, ValueError):  # includes urllib's URLError
+            ok = False
+        with self._lock:
+            if cancelled.is_set():
+                return  # drop() already reported it
+            if ok:
+                self._files[pkg] = files
+            self._set(pkg, "ready" if ok else "failed")
+
+
+def ensure_config_dir():
+    """Create ~/.pystudiomusic directory if it does not exist."""
+    CONFIG_DIR.mkdir(exist_ok=True)
+
+
+def _vercmp_part(a: str, b: str) -> int:
+    """dpkg's verrevcmp(): compare one upstream-version or revision part."""
+    def order(c):
+        if c.isdigit():
+            return 0
+        if c.isalpha():
+            return ord(c)
+        if c == "~":
+            return -1
+        return ord(c) + 256 if c else 0
+
+    i = j = 0
+    while i < len(a) or j < len(b):
+        first_diff = 0
+        while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+            ac = order(a[i]) if i < len(a) else 0
+            bc = order(b[j]) if j < len(b) else 0
+            if ac != bc:
+                return ac - bc
+            i += 1
+            j += 1
+        while i < len(a) and a[i] == "0":
+            i += 1
+        while j < len(b) and b[j] == "0":
+            j += 1
+        while i < len(a) and a[i].isdigit() and j < len(b) and b[j].isdigit():
+            if not first_diff:
+                first_diff = ord(a[i]) - ord(b[j])
+            i += 1
+            j += 1
+        if i < len(a) and a[i].isdigit():
+            return 1
+        if j < len(b) and b[j].isdigit():
+            return -1
+        if first_diff:
+            return first_diff
+    return 0
+
+
+def compare_versions(a: str, b: str) -> int:
+    """Compare two Debian version strings like `dpkg --compare-versions`."""
+    def split(v):
+        epoch, _, rest = v.partition(":") if ":" in v else ("0", "", v)
+        upstream, _, revision = rest.rpartition("-") if "-" in rest else (rest, "", "")
+        return int(epoch or 0), upstream, revision
+
+    ea, ua, ra = split(a)
+    eb, ub, rb = split(b)
+    if ea != eb:
+        return ea - eb
+    return _vercmp_part(ua, ub) or _vercmp_part(ra, rb)
+
+
+def _parse_packages_index(path, sections) -> dict:
+    """
+    Stream one apt Packages index through mmap and return
+    {pkg: [version, installed_size, description]} for the packages in
+    `sections` (matching "sound" as well as "universe/sound").
+    """
+    found = {}
+    with open(path, "rb") as fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return found  # empty file
+        with mm:
+            fields = {}
+            for line in iter(mm.readline, b""):
+                if line in (b"\n", b"\r\n"):
+                    _collect_package(fields, sections, found)
+                    fields = {}
+                elif line[:1] not in (b" ", b"\t"):
+                    key, _, value = line.partition(b":")
+                    if key in (b"Package", b"Section", b"Version",
+                               b"Installed-Size", b"Description"):
+                        fields[key] = value.strip().decode("utf-8", "replace")
+            _collect_package(fields, sections, found)
+    return found
+
+
+def _collect_package(fields, sections, found):
+    """Keep the stanza in `fields` if it is in `sections`, newest version wins."""
+    pkg = fields.get(b"Package")
+    section = fields.get(b"Section", "").rpartition("/")[2]
+    if not pkg or section not in sections:
+        return
+    version = fields.get(b"Version", "")
+    if pkg in found and compare_versions(found[pkg][0], version) >= 0:
+        return
+    try:
+        size = int(fields.get(b"Installed-Size", 0))
+    except ValueError:
+        size = 0
+    found[pkg] = [version, size, fields.get(b"Description", "")]
+
+
+@traced("catalog")
+def import_archive_packages(sections) -> dict:
+    """
+    Return {pkg: [candidate version, installed size, description]} for every
+    package in `sections` found in the local apt lists. Parsed results are
+    kept per list file in IMPORT_CACHE_FILE, so only list files changed since
+    the last import (by size and mtime) are parsed again.
+    """
+    sections = sorted(sections)
+    try:
+        data = json.loads(IMPORT_CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    if not isinstance(data, dict) or data.get("sections") != sections:
+        data = {}
+    cached = data.get("files", {})
+
+    files = {}
+    try:
+        lists = sorted(APT_LISTS_DIR.glob("*_Packages"))
+    except OSError:
+        lists = []
+    for path in lists:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = cached.get(path.name)
+        if entry is None or entry.get("stamp") != stamp:
+            try:
+                entry = {"stamp": stamp,
+                         "packages": _parse_packages_index(path, set(sections))}
+            except OSError:
+                continue
+        files[path.name] = entry
+
+    if files != cached and CONFIG_DIR.is_dir():
+        _write_json_atomic(IMPORT_CACHE_FILE, {"sections": sections, "files": files})
+
+    merged = {}
+    for entry in files.values():
+        for pkg, info in entry["packages"].items():
+            if pkg not in merged or compare_versions(info[0], merged[pkg][0]) > 0:
+                merged[pkg] = info
+    return merged
+
+
+@traced("catalog")
+def load_catalog(archive=True):
+    """
+    Populate the global `apps` dict from built‐in entries, packages imported
+    from the apt indexes and the custom file.
+    Install status is left unknown (None); see `load_apps`.
+
+    With `archive` False the apt indexes are not read; the GUI imports
+    them in the background with `archive_entries` / `add_archive_entries`.
+    """
+    apps.clear()
+
+    # Load built‐in entries
+    for uid, (name, cat, desc, pkg, cmd) in BUILTIN_APPS.items():
+        apps[uid] = AppEntry(uid, name, cat, desc, pkg, cmd, custom=False)
+
+    # Load user‐custom entries
+    for entry in custom_store.entries():
+        apps[entry.uid] = entry
+
+    launch_profiles.clear()
+    launch_profiles.update(custom_store.profiles())
+
+    search_index.reset(apps.values())
+
+    if archive:
+        add_archive_entries(archive_entries(entry.pkg for entry in apps.values()))
+
+
+def archive_entries(known) -> list:
+    """
+    Return AppEntry objects for the packages of the configured archive
+    sections, skipping the package names in `known` (covered by another
+    entry). Imported entries have no launch command. Does not touch
+    `apps`, so it can run in a worker thread.
+    """
+    sections = load_settings()["import_sections"]
+    if not sections:
+        return []
+    known = set(known)
+    entries = []
+    for pkg, (version, size, desc) in import_archive_packages(sections).items():
+        if pkg in known:
+            continue
+        entry = AppEntry(pkg, pkg, IMPORTED_CATEGORY, desc, pkg, "", custom=False)
+        entry.version = version
+        entry.installed_size = size
+        entries.append(entry)
+    return entries
+
+
+def add_archive_entries(entries) -> list:
+    """Add imported `entries` to the catalog, unless their uid is taken; return those added."""
+    added = []
+    for entry in entries:
+        if entry.uid in apps:
+            continue
+        apps[entry.uid] = entry
+        search_index.add(entry)
+        added.append(entry)
+    return added
+
+
+@traced("catalog")
+def load_apps():
+    """
+    Populate the global `apps` dict from built‐in + custom file.
+    Update 'installed' and 'desired' flags.
+    """
+    load_catalog()
+
+    # Check installation status of the whole catalog in one pass
+    installed = installed_packages(entry.pkg for entry in apps.values())
+    for entry in apps.values():
+        entry.installed = entry.pkg in installed
+        entry.desired = entry.installed  # default checkbox = current state
+
+
+def add_custom_app(entry):
+    """Add a custom AppEntry to the catalog and persist it."""
+    custom_store.insert(entry)
+    apps[entry.uid] = entry
+    search_index.add(entry)
+
+
+def update_custom_app(entry):
+    """Persist changes made to a custom AppEntry already in the catalog."""
+    custom_store.update(entry)
+    search_index.add(entry)
+
+
+def delete_custom_app(uid):
+    """Remove a custom entry from the catalog and persist the change."""
+    custom_store.delete(uid)
+    del apps[uid]
+    search_index.remove(uid)
+
+
+def set_launch_profile(uid, profile):
+    """Store the launch profile for `uid`; None or a default profile clears it."""
+    if profile is None or profile.to_dict() == LaunchProfile().to_dict():
+        launch_profiles.pop(uid, None)
+        custom_store.delete_profile(uid)
+    else:
+        launch_profiles[uid] = profile
+        custom_store.save_profile(uid, profile)
+
+
+def save_custom_apps():
+    """Write all custom AppEntry objects to the store in one transaction."""
+    custom_store.replace_all(entry for entry in apps.values() if entry.custom)
+
+
+# -------------------------------------------------------------------
+# Launching applications
+# -------------------------------------------------------------------
+
+def describe_exit(returncode) -> str:
+    """Human-readable form of a Popen-style return code."""
+    if returncode is None:
+        return "running"
+    if returncode < 0:
+        try:
+            return f"killed by {signal.Signals(-returncode).name}"
+        except ValueError:
+            return f"killed by signal {-returncode}"
+    return "exited normally" if returncode == 0 else f"failed (exit status {returncode})"
+
+
+def spawn_app(entry, profile=None, **popen_args):
+    """
+    Start `entry.cmd` with `profile` (default: its stored launch profile)
+    applied. Returns (Popen, [profile warnings]); raises OSError on failure.
+    """
+    argv, warnings, env = entry.cmd.split(), [], None
+    if profile is None:
+        profile = launch_profiles.get(entry.uid)
+    if profile is not None:
+        if argv and shutil.which(argv[0]) is None:
+            # Fail here, as a plain launch would, not inside chrt/nice
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), argv[0])
+        argv, warnings = profile.wrap(argv)
+        env = profile.environ()
+    with tracer.span("spawn", "launch", {"argv": argv}):
+        return subprocess.Popen(argv, env=env, **popen_args), warnings
+
+
+class LaunchSupervisor:
+    """
+    Starts catalog applications and keeps track of their processes per uid.
+
+    Children are never polled: `watch_child(pid, callback)` must arrange for
+    callback(pid, wait_status) to be called once the child exits, and must
+    reap it (GLib.child_watch_add does both). on_exit(uid, pid, returncode)
+    is then called with a Popen-style return code.
+    """
+
+    def __init__(self, watch_child, on_exit=None):
+        self._watch_child = watch_child
+        self.on_exit = on_exit
+        self.running = {}  # uid -> {pid: Popen}
+
+    def is_running(self, uid) -> bool:
+        return bool(self.running.get(uid))
+
+    def pids(self, uid) -> list:
+        return sorted(self.running.get(uid, ()))
+
+    def launch(self, entry, profile=None):
+        """
+        Start `entry` with `profile` (default: its stored launch profile)
+        and return (Popen, warnings),
+        or (None, []) if it is already running (duplicates are refused).
+        Raises OSError if the command cannot start.
+        """
+        if self.is_running(entry.uid):
+            return None, []
+        proc, warnings = spawn_app(entry, profile)
+        self.running.setdefault(entry.uid, {})[proc.pid] = proc
+        self._watch_child(proc.pid, lambda pid, status, uid=entry.uid:
+                          self._on_child_exit(uid, pid, status))
+        return proc, warnings
+
+    def stop(self, uid, sig=signal.SIGTERM):
+        """Send `sig` to every process started for `uid`."""
+        for proc in list(self.running.get(uid, {}).values()):
+            try:
+                proc.send_signal(sig)
+            except OSError:
+                pass
+
+    def stop_all(self, sig=signal.SIGTERM):
+        for uid in list(self.running):
+            self.stop(uid, sig)
+
+    def _on_child_exit(self, uid, pid, status):
+        procs = self.running.get(uid, {})
+        proc = procs.pop(pid, None)
+        if not procs:
+            self.running.pop(uid, None)
+        returncode = os.waitstatus_to_exitcode(status)
+        if proc is not None:
+            proc.returncode = returncode  # already reaped by the watcher
+        if self.on_exit is not None:
+            self.on_exit(uid, pid, returncode)
+
+
+def readiness_probe(entry):
+    """Return the (kind, target) readiness probe for a server entry."""
+    if entry.uid in READINESS_PROBES:
+        return READINESS_PROBES[entry.uid]
+    return ("process", os.path.basename(entry.cmd.split()[0])[:15] if entry.cmd else "")
+
+
+def _socket_accepts(path) -> bool:
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(0.2)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def _process_running(name) -> bool:
+    if not name:
+        return False
+    try:
+        pids = [d for d in os.listdir("/proc") if d.isdigit()]
+    except OSError:
+        return False
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/comm", encoding="utf-8", errors="replace") as fh:
+                if fh.read().strip() == name:
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+def probe_ready(probe) -> bool:
+    """Run one readiness probe; True once the server can take clients."""
+    kind, target = probe
+    if kind == "socket":
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+        return _socket_accepts(target.format(uid=os.getuid(), runtime_dir=runtime_dir))
+    if kind == "process":
+        return _process_running(target)
+    if kind == "command":
+        try:
+            with tracer.span("readiness", "subprocess", {"argv": target}):
+                return subprocess.run(target.split(), stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL, timeout=5).returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+    return False
+
+
+def launch_groups(entries):
+    """Split entries into (servers, clients), each in catalog name order."""
+    ordered = sorted(entries, key=lambda e: e.name.lower())
+    servers = [e for e in ordered if e.category == SERVER_CATEGORY]
+    clients = [e for e in ordered if e.category != SERVER_CATEGORY]
+    return servers, clients
+
+
+class StudioSession:
+    """
+    A named set of applications to bring up together. It keeps a ready
+    launch plan — each app's command, category and launch profile as they
+    were when saved, servers first — so restoring needs neither the
+    catalog nor a status probe.
+    """
+
+    def __init__(self, name, plan, saved=None):
+        self.name = name
+        self.plan = plan      # [{"uid", "name", "category", "cmd", "profile"}]
+        self.saved = saved if saved is not None else time.time()
+
+    @classmethod
+    def from_entries(cls, name, entries):
+        servers, clients = launch_groups(entries)
+        plan = []
+        for entry in servers + clients:
+            profile = launch_profiles.get(entry.uid, LaunchProfile())
+            plan.append({"uid": entry.uid, "name": entry.name, "category": entry.category,
+                         "cmd": entry.cmd, "profile": profile.to_dict()})
+        return cls(name, plan)
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(name, data["plan"], data.get("saved"))
+
+    def to_dict(self) -> dict:
+        return {"plan": self.plan, "saved": self.saved}
+
+    def launch_plan(self):
+        """Return (servers, clients, {uid: LaunchProfile}) in launch order."""
+        servers, clients, profiles = [], [], {}
+        for item in self.plan:
+            entry = AppEntry(item["uid"], item["name"], item["category"], "", "", item["cmd"])
+            (servers if entry.category == SERVER_CATEGORY else clients).append(entry)
+            profiles[entry.uid] = LaunchProfile.from_dict(item["profile"])
+        return servers, clients, profiles
+
+
+def wait_until_ready(entries, timeout=READY_TIMEOUT, interval=0.1) -> list:
+    """
+    Block until every server in `entries` passes its readiness probe, or
+    `timeout` seconds pass. Returns the entries that never became ready.
+    """
+    pending = {entry.uid: (entry, readiness_probe(entry)) for entry in entries}
+    deadline = time.monotonic() + timeout
+    while pending:
+        for uid, (_entry, probe) in list(pending.items()):
+            if probe_ready(probe):
+                del pending[uid]
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(interval)
+    return [entry for entry, _probe in pending.values()]
+
+
+# -------------------------------------------------------------------
+# Low-latency system audit
+# -------------------------------------------------------------------
+
+class AuditResult:
+    """
+    Outcome of one audit check: ok is True (pass), False (fail) or None
+    (could not be determined); `fix` suggests how to resolve a failure.
+    """
+
+    def __init__(self, key, title, ok, detail, fix=""):
+        self.key = key
+        self.title = title
+        self.ok = ok
+        self.detail = detail
+        self.fix = fix
+
+    def to_dict(self) -> dict:
+        return {"key": self.key, "title": self.title, "ok": self.ok,
+                "detail": self.detail, "fix": self.fix}
+
+
+def _read(root, path, default=None):
+    """Text of `path` below `root` (a real or fake /), or `default`."""
+    try:
+        return (root / path).read_text(encoding="utf-8", errors="replace").strip()
+    except OSError:
+        return default
+
+
+def _kernel_config(root) -> dict:
+    """CONFIG_* options of the running kernel, from /proc/config.gz or /boot."""
+    import gzip
+    text = None
+    try:
+        with gzip.open(root / "proc/config.gz", "rt", encoding="utf-8") as fh:
+            text = fh.read()
+    except (OSError, EOFError):
+        release = _read(root, "proc/sys/kernel/osrelease")
+        if release:
+            text = _read(root, f"boot/config-{release}")
+    config = {}
+    for line in (text or "").splitlines():
+        name, sep, value = line.partition("=")
+        if sep and name.startswith("CONFIG_"):
+            config[name] = value
+    return config
+
+
+def _proc_limit(root, name):
+    """Soft limit `name` of /proc/self/limits: an int, "unlimited" or None."""
+    for line in (_read(root, "proc/self/limits") or "").splitlines():
+        if line.startswith(name):
+            soft = line[len(name):].split()[0]
+            return soft if soft == "unlimited" else int(soft)
+    return None
+
+
+def _preemption_model(root):
+    """"rt", "full", "voluntary", "none" or None if it cannot be told."""
+    if _read(root, "sys/kernel/realtime") == "1":
+        return "rt"
+    # Dynamic preemption: the active model is shown in parentheses
+    match = re.search(r"\((\w+)\)", _read(root, "sys/kernel/debug/sched/preempt", ""))
+    if match:
+        return match.group(1)
+    config = _kernel_config(root)
+    if config.get("CONFIG_PREEMPT_RT") == "y":
+        return "rt"
+    match = re.search(r"\bpreempt=(\w+)", _read(root, "proc/cmdline", ""))
+    if match and config.get("CONFIG_PREEMPT_DYNAMIC") == "y":
+        return match.group(1)
+    if config.get("CONFIG_PREEMPT") == "y":
+        return "full"
+    if config.get("CONFIG_PREEMPT_VOLUNTARY") == "y":
+        return "voluntary"
+    if config.get("CONFIG_PREEMPT_NONE") == "y":
+        return "none"
+    version = _read(root, "proc/version", "")
+    if "PREEMPT_RT" in version:
+        return "rt"
+    if re.search(r"\bPREEMPT\b(?!_)", version):
+        return "full"
+    return None
+
+
+def audit_governor(root):
+    governors = {}
+    for path in sorted((root / "sys/devices/system/cpu").glob("cpu[0-9]*/cpufreq/scaling_governor")):
+        governor = _read(root, path.relative_to(root), "?")
+        governors[governor] = governors.get(governor, 0) + 1
+    if not governors:
+        return None, "no CPU frequency scaling exposed", ""
+    detail = ", ".join(f"{n} × {g}" for g, n in sorted(governors.items()))
+    if set(governors) == {"performance"}:
+        return True, detail, ""
+    return False, detail, ("sudo cpupower frequency-set -g performance "
+                           "(package linux-cpupower), or set it in your power profile")
+
+
+def audit_preemption(root):
+    model = _preemption_model(root)
+    if model is None:
+        return None, "kernel preemption model unknown", ""
+    if model in ("rt", "full"):
+        return True, f"{model} preemption", ""
+    return False, f"{model} preemption", ("boot with preempt=full (kernels with PREEMPT_DYNAMIC), "
+                                          "or install linux-lowlatency / linux-image-rt")
+
+
+def audit_rtprio(root):
+    limit = _proc_limit(root, "Max realtime priority")
+    if limit is None:
+        return None, "rtprio limit unknown", ""
+    fix = ('add "@audio - rtprio 95" to /etc/security/limits.d/audio.conf, '
+           "join the audio group and log in again")
+    if limit == "unlimited" or limit >= AUDIT_MIN_RTPRIO:
+        return True, f"rtprio {limit}", ""
+    return False, f"rtprio {limit} (want ≥ {AUDIT_MIN_RTPRIO})", fix
+
+
+def audit_memlock(root):
+    limit = _proc_limit(root, "Max locked memory")
+    if limit is None:
+        return None, "memlock limit unknown", ""
+    if limit == "unlimited":
+        return True, "memlock unlimited", ""
+    detail = f"memlock {limit // 1024 ** 2} MiB"
+    if limit >= AUDIT_MIN_MEMLOCK:
+        return True, detail, ""
+    return False, detail + f" (want ≥ {AUDIT_MIN_MEMLOCK // 1024 ** 2} MiB)", (
+        'add "@audio - memlock unlimited" to /etc/security/limits.d/audio.conf '
+        "and log in again")
+
+
+def audit_swappiness(root):
+    value = _read(root, "proc/sys/vm/swappiness")
+    if value is None or not value.isdigit():
+        return None, "swappiness unknown", ""
+    if int(value) <= AUDIT_MAX_SWAPPINESS:
+        return True, f"swappiness {value}", ""
+    return False, f"swappiness {value} (want ≤ {AUDIT_MAX_SWAPPINESS})", (
+        f"echo vm.swappiness={AUDIT_MAX_SWAPPINESS} | sudo tee /etc/sysctl.d/90-audio.conf "
+        "&& sudo sysctl --system")
+
+
+def audit_audio_group(root):
+    members = gid = None
+    for line in (_read(root, "etc/group") or "").splitlines():
+        fields = line.split(":")
+        if len(fields) == 4 and fields[0] == "audio":
+            gid, members = fields[2], fields[3].split(",")
+    if gid is None:
+        return None, "no audio group on this system", ""
+    groups = set()
+    for line in (_read(root, "proc/self/status") or "").splitlines():
+        if line.startswith(("Groups:", "Gid:")):
+            groups.update(line.split()[1:])
+    if gid in groups:
+        return True, "member of audio", ""
+    try:
+        user = pwd.getpwuid(os.getuid()).pw_name
+    except KeyError:
+        user = os.environ.get("USER", "")
+    if user in members:
+        return False, "added to audio, but not in this session", "log out and back in"
+    return False, "not a member of audio", "sudo usermod -aG audio $USER, then log in again"
+
+
+def audit_irq_threads(root):
+    if "threadirqs" in _read(root, "proc/cmdline", "").split():
+        return True, "threadirqs enabled", ""
+    if _preemption_model(root) == "rt":
+        return True, "forced by the real-time kernel", ""
+    return False, "interrupt handlers not threaded", (
+        'add "threadirqs" to GRUB_CMDLINE_LINUX_DEFAULT in /etc/default/grub, '
+        "run sudo update-grub and reboot")
+
+
+def audit_timer_hz(root):
+    hz = _kernel_config(root).get("CONFIG_HZ")
+    if hz is None or not hz.isdigit():
+        return None, "timer frequency unknown (kernel config not readable)", ""
+    if int(hz) >= AUDIT_MIN_HZ:
+        return True, f"{hz} Hz", ""
+    return False, f"{hz} Hz (want ≥ {AUDIT_MIN_HZ})", "install a lowlatency or real-time kernel"
+
+
+# Audit checks, in display order: (key, title, check(root) -> (ok, detail, fix))
+AUDIT_CHECKS = [
+    ("governor",   "CPU frequency governor",   audit_governor),
+    ("preemption", "Kernel preemption model",  audit_preemption),
+    ("rtprio",     "Real-time priority limit", audit_rtprio),
+    ("memlock",    "Locked memory limit",      audit_memlock),
+    ("swappiness", "Swappiness",               audit_swappiness),
+    ("audio",      "Audio group membership",   audit_audio_group),
+    ("irqs",       "Threaded IRQs",            audit_irq_threads),
+    ("hz",         "Timer frequency",          audit_timer_hz),
+]
+
+
+@traced("audit")
+def run_audit(root="/", on_result=None) -> list:
+    """
+    Run every audit check concurrently against `root` (/ or a fake
+    procfs/sysfs tree) and return the AuditResults in display order.
+    `on_result` is called from the worker threads as each check finishes.
+    """
+    from concurrent.futures import ThreadPoolExecutor  # kept out of CLI startup
+    root = Path(root)
+
+    def run(key, title, check):
+        try:
+            with tracer.span(f"audit:{key}", "audit"):
+                result = AuditResult(key, title, *check(root))
+        except Exception as exc:  # a broken probe must not sink the audit
+            result = AuditResult(key, title, None, f"could not check: {exc}")
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(AUDIT_CHECKS)) as pool:
+        futures = [pool.submit(run, *check) for check in AUDIT_CHECKS]
+    return [future.result() for future in futures]
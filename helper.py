@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PyStudioMusic privileged helper.
+
+Started once per session by the GUI (core.HelperClient runs it through
+sudo), it reads package transactions from stdin and reports their
+progress on stdout, one JSON object per line (see HelperClient for the
+protocol). Requests that arrive while apt is busy are merged into the
+next single apt run; runs never overlap and wait for other package
+managers to release the dpkg lock.
+
+    sudo python3 helper.py                  # real backend (apt-get, dpkg)
+    python3 helper.py --fake --fake-log runs.jsonl   # no root, nothing installed
+
+Author: Luca Bocaletto
+License: GPLv3
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from core import (
+    VERSION, HELPER_PROTOCOL, PACKAGE_NAME, AptTransaction, TransactionPlan,
+)
+
+# dpkg's frontend lock, held by apt (or any other frontend) while it runs
+DPKG_FRONTEND_LOCK = Path("/var/lib/dpkg/lock-frontend")
+
+# Seconds to wait for more requests before starting a run, so a burst of
+# clicks becomes one apt transaction
+BATCH_WINDOW = 0.2
+
+
+class Request:
+    """One validated "apply" request from the client."""
+
+    def __init__(self, ident, install, remove, purge, prefetched, update):
+        self.id = ident
+        self.install = install
+        self.remove = remove
+        self.purge = purge
+        self.prefetched = prefetched
+        self.update = update
+
+    @classmethod
+    def parse(cls, message):
+        """Build a Request from a client message; raises ValueError if unsafe."""
+        lists = {}
+        for key in ("install", "remove", "purge"):
+            pkgs = message.get(key, [])
+            if not isinstance(pkgs, list) or not all(
+                    isinstance(pkg, str) and PACKAGE_NAME.match(pkg) for pkg in pkgs):
+                raise ValueError(f"invalid package list in '{key}'")
+            lists[key] = pkgs
+        # Prefetching only saves apt a download: unusable archives are
+        # dropped rather than failing the transaction
+        prefetched = message.get("prefetched", [])
+        if not isinstance(prefetched, list):
+            prefetched = []
+        prefetched = [path for path in prefetched if _is_prefetched_archive(path)]
+        return cls(message["id"], lists["install"], lists["remove"], lists["purge"],
+                   prefetched, bool(message.get("update")))
+
+
+def _is_prefetched_archive(path) -> bool:
+    """Only regular .deb files of the invoking user are copied into apt's cache."""
+    if not isinstance(path, str) or not path.startswith("/") or not path.endswith(".deb"):
+        return False
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    owner = os.environ.get("SUDO_UID")
+    return os.path.isfile(path) and not os.path.islink(path) and (
+        owner is None or st.st_uid == int(owner))
+
+
+def merge(requests) -> TransactionPlan:
+    """One plan for a batch of requests; a later request overrides an earlier one."""
+    actions, prefetched = {}, []
+    for request in requests:
+        for action in ("install", "remove", "purge"):
+            for pkg in getattr(request, action):
+                actions[pkg] = action
+        prefetched += request.prefetched
+    return TransactionPlan(
+        install=[pkg for pkg, action in actions.items() if action == "install"],
+        remove=[pkg for pkg, action in actions.items() if action == "remove"],
+        purge=[pkg for pkg, action in actions.items() if action == "purge"],
+        prefetched=sorted(set(prefetched)),
+        update=any(request.update for request in requests))
+
+
+def wait_for_dpkg_lock(path, on_wait, cancelled) -> bool:
+    """
+    Block until no other process holds the dpkg frontend lock at `path`.
+    Returns False if `cancelled()` becomes true meanwhile. apt takes the
+    lock itself (and waits on it too, see AptTransaction.LOCK_OPTS); this
+    only keeps a busy system from failing or stalling a run silently.
+    """
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o640)
+    except OSError:
+        return True  # cannot check; leave it to apt
+    try:
+        waiting = False
+        while True:
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                if not waiting:
+                    on_wait()
+                    waiting = True
+                if cancelled():
+                    return False
+                time.sleep(0.5)
+                continue
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+            return True
+    finally:
+        os.close(fd)
+
+
+# -------------------------------------------------------------------
+# Backends
+# -------------------------------------------------------------------
+
+class AptBackend:
+    """Runs plans with apt-get/dpkg; the helper must be root."""
+
+    name = "apt"
+
+    def transaction(self, plan, on_progress, on_line, on_done):
+        return AptTransaction(plan.cmds(sudo=False), on_progress, on_line, on_done,
+                              record_update=False)
+
+
+class FakeBackend:
+    """
+    Pretends to run plans without root or apt: every package takes
+    `delay` seconds, and each plan is appended to the `log` file as a
+    JSON line, so tests can see what was batched together.
+    """
+
+    name = "fake"
+
+    def __init__(self, delay=0.05, log=None):
+        self.delay = delay
+        self.log = log
+
+    def transaction(self, plan, on_progress, on_line, on_done):
+        return FakeTransaction(self, plan, on_progress, on_line, on_done)
+
+
+class FakeTransaction:
+    def __init__(self, backend, plan, on_progress, on_line, on_done):
+        self.backend = backend
+        self.plan = plan
+        self.on_progress = on_progress
+        self.on_line = on_line
+        self.on_done = on_done
+        self.cancelled = False
+        self.committed = False
+        self.finished = False
+        self.touched = set()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _run(self):
+        message = "Transaction failed."
+        try:
+            self._run_plan()
+        except Exception as exc:
+            message = f"Transaction failed: {exc}"
+        finally:
+            if not self.finished:
+                self._finish(False, message)
+
+    def _finish(self, ok, message):
+        self.finished = True
+        self.on_done(ok, message)
+
+    def _run_plan(self):
+        if self.backend.log:
+            with open(self.backend.log, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"install": self.plan.install, "remove": self.plan.remove,
+                                     "purge": self.plan.purge,
+                                     "update": self.plan.needs_update()}) + "\n")
+        pkgs = self.plan.install + self.plan.remove + self.plan.purge
+        for done, pkg in enumerate(pkgs, start=1):
+            if self.cancelled and not self.committed:
+                self._finish(False, "Transaction cancelled.")
+                return
+            self.committed = True  # like dpkg: runs to the end from here
+            time.sleep(self.backend.delay)
+            self.touched.add(pkg.split(":", 1)[0])
+            self.on_line(f"Processing {pkg} (fake)")
+            self.on_progress(done / len(pkgs), pkg)
+        self._finish(True, "")
+
+
+# -------------------------------------------------------------------
+# Server
+# -------------------------------------------------------------------
+
+class Helper:
+    def __init__(self, backend, lock_path, out=sys.stdout):
+        self.backend = backend
+        self.lock_path = lock_path
+        self.out = out
+        self.queue = []        # Requests waiting for the next run
+        self.batch = []        # Requests in the run in progress
+        self.transaction = None
+        self.batch_cancelled = threading.Event()
+        self.closing = False
+        self.client_gone = False  # stdout is closed: nobody reads our events
+        self._cond = threading.Condition()
+        self._out_lock = threading.Lock()
+
+    def emit(self, event):
+        with self._out_lock:
+            if self.client_gone:
+                return
+            try:
+                self.out.write(json.dumps(event) + "\n")
+                self.out.flush()
+            except OSError:
+                # The client went away; a run in progress still completes
+                # (apt must not be left half done), nothing new is started
+                self.client_gone = True
+
+    def serve(self, inp):
+        self.emit({"event": "hello", "protocol": HELPER_PROTOCOL, "version": VERSION,
+                   "backend": self.backend.name})
+        worker = threading.Thread(target=self._work)
+        worker.start()
+        for line in inp:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                self.emit({"event": "error", "message": "not JSON"})
+                continue
+            if not isinstance(message, dict) or not self._handle(message):
+                break
+        with self._cond:
+            self.closing = True  # finish what is queued, then exit
+            self._cond.notify()
+        worker.join()
+
+    def _handle(self, message) -> bool:
+        """Act on one client message; False once the client says goodbye."""
+        op = message.get("op")
+        if op == "apply":
+            try:
+                request = Request.parse(message)
+            except (KeyError, ValueError) as exc:
+                self.emit({"id": message.get("id"), "event": "done", "ok": False,
+                           "message": f"Rejected by the helper: {exc}"})
+                return True
+            with self._cond:
+                self.queue.append(request)
+                self._cond.notify()
+            self.emit({"id": request.id, "event": "queued"})
+        elif op == "cancel":
+            self._cancel(message.get("id"))
+        elif op == "shutdown":
+            return False
+        else:
+            self.emit({"id": message.get("id"), "event": "error",
+                       "message": f"unknown op {op!r}"})
+        return True
+
+    def _cancel(self, ident):
+        with self._cond:
+            queued = [r for r in self.queue if r.id == ident]
+            self.queue = [r for r in self.queue if r.id != ident]
+            if any(r.id == ident for r in self.batch):
+                # Requests were merged into one apt run: it stops as a whole
+                self.batch_cancelled.set()
+                if self.transaction is not None:
+                    self.transaction.cancel()
+        for request in queued:
+            self.emit({"id": request.id, "event": "done", "ok": False,
+                       "message": "Transaction cancelled."})
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self.queue and not self.closing:
+                    self._cond.wait()
+                if self.client_gone:
+                    self.queue = []
+                if not self.queue:
+                    return
+            time.sleep(BATCH_WINDOW)
+            with self._cond:
+                self.batch, self.queue = self.queue, []
+                self.batch_cancelled = threading.Event()
+            if self.batch:
+                self._run_batch(self.batch)
+            with self._cond:
+                self.batch, self.transaction = [], None
+
+    def _broadcast(self, batch, event):
+        for request in batch:
+            self.emit(dict(event, id=request.id))
+
+    def _run_batch(self, batch):
+        plan = merge(batch)
+        if self.lock_path is not None and not wait_for_dpkg_lock(
+                self.lock_path,
+                lambda: self._broadcast(batch, {"event": "progress", "fraction": 0.0,
+                                                "text": "Waiting for another package manager…"}),
+                self.batch_cancelled.is_set):
+            self._broadcast(batch, {"event": "done", "ok": False,
+                                    "message": "Transaction cancelled."})
+            return
+
+        done = threading.Event()
+        result = {}
+
+        def on_done(ok, message):
+            result.update(ok=ok, message=message)
+            done.set()
+
+        transaction = self.backend.transaction(
+            plan,
+            on_progress=lambda fraction, text: self._broadcast(
+                batch, {"event": "progress", "fraction": fraction, "text": text,
+                        "committed": transaction.committed}),
+            on_line=lambda line: self._broadcast(batch, {"event": "line", "line": line}),
+            on_done=on_done)
+        with self._cond:
+            self.transaction = transaction
+        transaction.start()
+        if self.batch_cancelled.is_set():
+            transaction.cancel()
+        done.wait()
+        self._broadcast(batch, {"event": "done", "ok": result["ok"],
+                                "message": result["message"],
+                                "touched": sorted(transaction.touched),
+                                "updated": result["ok"] and plan.needs_update()})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PyStudioMusic privileged helper.")
+    parser.add_argument("--fake", action="store_true",
+                        help="pretend to run transactions (no root, nothing installed)")
+    parser.add_argument("--fake-delay", type=float, default=0.05,
+                        help="seconds per package with --fake")
+    parser.add_argument("--fake-log", help="append each fake run to this JSON-lines file")
+    parser.add_argument("--lock", help="dpkg frontend lock to wait on "
+                        f"(default: {DPKG_FRONTEND_LOCK}; none with --fake)")
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        backend = FakeBackend(args.fake_delay, args.fake_log)
+        lock = Path(args.lock) if args.lock else None
+    else:
+        if os.geteuid() != 0:
+            print("helper.py: must run as root (or use --fake)", file=sys.stderr)
+            return 1
+        backend = AptBackend()
+        lock = Path(args.lock) if args.lock else DPKG_FRONTEND_LOCK
+
+    Helper(backend, lock).serve(sys.stdin)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
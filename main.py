@@ -11,158 +11,51 @@ License: GPLv3
 Date: 2025-08-02
 """
 
-import subprocess
-from pathlib import Path
+import threading
+import time
 
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, Gdk, GLib
+
+from core import (
+    VERSION, CONFIG_DIR, CUSTOM_DB, STATUS_CACHE_FILE, IMPORT_CACHE_FILE,
+    SETTINGS_FILE, AUDIT_CHECKS, CATEGORIES, AppEntry, AptTransaction,
+    HelperClient, HelperError, LaunchProfile, LaunchSupervisor, Prefetcher,
+    StudioSession, TransactionPlan, apps, custom_store, launch_profiles,
+    search_index, add_archive_entries, add_custom_app, archive_entries,
+    delete_custom_app, dependency_graph, ensure_config_dir, estimate_plan,
+    installed_packages, removal_impact,
+    load_catalog, load_settings, describe_exit, launch_groups, probe_ready,
+    readiness_probe, run_audit, set_launch_profile, traced, tracer, wait_until_ready,
+)
 
 # -------------------------------------------------------------------
-# Configuration constants
+# GUI constants
 # -------------------------------------------------------------------
 
-VERSION = "1.0.0"
-HOME = Path.home()
-CONFIG_DIR = HOME / ".pystudiomusic"
-CUSTOM_FILE = CONFIG_DIR / "apps.custom"
-
-# Categories for user‐custom applications
-CATEGORIES = [
-    "DAW", "Editor", "Server", "Synthesizer",
-    "Plugin Host", "Looper", "DJ", "Patchbay",
-    "Suite", "Utility"
-]
-
-# Built‐in catalog of known audio/music apps:
-#   uid -> (Name, Category, Short description, apt package, launch command)
-BUILTIN_APPS = {
-    "ardour":       ("Ardour",         "DAW",           "Professional DAW",              "ardour",        "ardour"),
-    "lmms":         ("LMMS",           "DAW",           "Pattern-based music creation", "lmms",          "lmms"),
-    "qtractor":     ("Qtractor",       "DAW",           "JACK-centric sequencer",        "qtractor",      "qtractor"),
-    "rosegarden":   ("Rosegarden",     "DAW",           "MIDI & notation editor",       "rosegarden",    "rosegarden"),
-    "musescore":    ("MuseScore",      "Editor",        "Music notation software",      "musescore3",    "musescore3"),
-    "audacity":     ("Audacity",       "Editor",        "Audio editor",                 "audacity",      "audacity"),
-    "jackd2":       ("JACK2",          "Server",        "Low-latency audio server",      "jackd2",        "jackd"),
-    "pipewire":     ("PipeWire",       "Server",        "Modern audio server",          "pipewire",      "pipewire"),
-    "pulseaudio":   ("PulseAudio",     "Server",        "Sound server",                 "pulseaudio",    "pulseaudio"),
-    "hydrogen":     ("Hydrogen",       "Synthesizer",   "Advanced drum machine",        "hydrogen",      "hydrogen"),
-    "fluidsynth":   ("FluidSynth",     "Synthesizer",   "SoundFont software synth",     "fluidsynth",    "fluidsynth"),
-    "qsynth":       ("Qsynth",         "Synthesizer",   "GUI for FluidSynth",           "qsynth",        "qsynth"),
-    "carla":        ("Carla",          "Plugin Host",   "VST/LV2 plugin host",          "carla",         "carla"),
-    "sooperlooper": ("SooperLooper",   "Looper",        "Live looping tool",            "sooperlooper",  "sooperlooper"),
-    "mixxx":        ("Mixxx",          "DJ",            "DJ mixing software",           "mixxx",         "mixxx"),
-    "patchage":     ("Patchage",       "Patchbay",      "LV2/JACK patchbay",            "patchage",      "patchage"),
-    "cadence":      ("Cadence",        "Suite",         "KXStudio tools suite",         "cadence",       "cadence"),
-    "ffmpeg":       ("FFmpeg",         "Utility",       "Multimedia framework",         "ffmpeg",        "ffmpeg"),
-    "sox":          ("SoX",            "Utility",       "Sound processing toolkit",     "sox",           "sox"),
-    "ecasound":     ("Ecasound",       "Utility",       "Multitrack audio recorder",    "ecasound",      "ecasound"),
-    "alsa-utils":   ("ALSA Utils",     "Utility",       "Mixer & MIDI tools",           "alsa-utils",    "alsamixer"),
-}
-
-
-class AppEntry:
-    """
-    Represents one audio/music application in our catalog:
-      - uid         : unique identifier
-      - name        : display name
-      - category    : one of CATEGORIES
-      - description : short text
-      - pkg         : Debian package name
-      - cmd         : shell command to launch
-      - custom      : True if user‐added
-      - installed   : updated at load time
-      - desired     : user selection for install/remove
-    """
-
-    def __init__(self, uid, name, category, description, pkg, cmd, custom=False):
-        self.uid = uid
-        self.name = name
-        self.category = category
-        self.description = description
-        self.pkg = pkg
-        self.cmd = cmd
-        self.custom = custom
-        self.installed = False
-        self.desired = False
-
-
-# Global in‐memory catalog: uid -> AppEntry
-apps = {}
+# Number of probe results applied per idle callback, so large catalogs
+# fill in without blocking the main loop
+STATUS_BATCH = 256
 
+# Lines of apt output kept in the Manage page log view
+LOG_MAX_LINES = 500
 
-# -------------------------------------------------------------------
-# System utility functions
-# -------------------------------------------------------------------
-
-def run_cmd(*cmd, check=False):
-    """Run a subprocess command, capture output silently."""
-    return subprocess.run(cmd, stdout=subprocess.PIPE,
-                          stderr=subprocess.PIPE, check=check)
-
-
-def is_installed(pkg: str) -> bool:
-    """Return True if Debian package ‘pkg’ is currently installed."""
-    result = run_cmd("dpkg-query", "-W", "-f=${Status}", pkg)
-    return result.stdout.decode().startswith("install ok installed")
-
-
-def apt_install(pkgs: list):
-    """Install packages via apt-get."""
-    run_cmd("sudo", "apt-get", "update", "-qq", check=True)
-    run_cmd("sudo", "apt-get", "install", "-y", *pkgs, check=True)
-
-
-def apt_remove(pkgs: list):
-    """Remove packages (leave config files)."""
-    run_cmd("sudo", "apt-get", "remove", "-y", *pkgs, check=True)
-
-
-def apt_purge(pkgs: list):
-    """Purge packages (delete config files)."""
-    run_cmd("sudo", "apt-get", "purge", "-y", *pkgs, check=True)
-
-
-def ensure_config_dir():
-    """Create ~/.pystudiomusic directory if it does not exist."""
-    CONFIG_DIR.mkdir(exist_ok=True)
-
-
-def load_apps():
-    """
-    Populate the global `apps` dict from built‐in + custom file.
-    Update 'installed' and 'desired' flags.
-    """
-    apps.clear()
-
-    # Load built‐in entries
-    for uid, (name, cat, desc, pkg, cmd) in BUILTIN_APPS.items():
-        apps[uid] = AppEntry(uid, name, cat, desc, pkg, cmd, custom=False)
-
-    # Load user‐custom entries from apps.custom
-    if CUSTOM_FILE.exists():
-        for line in CUSTOM_FILE.read_text(encoding="utf-8").splitlines():
-            parts = line.split("|")
-            if len(parts) == 6:
-                uid, name, cat, desc, pkg, cmd = parts
-                apps[uid] = AppEntry(uid, name, cat, desc, pkg, cmd, custom=True)
+# Milliseconds without checkbox changes before the plan preview is
+# simulated, so a burst of clicks runs apt's solver once
+PREVIEW_DELAY = 300
 
-    # Check installation status
-    for entry in apps.values():
-        entry.installed = is_installed(entry.pkg)
-        entry.desired = entry.installed  # default checkbox = current state
+# Seconds of row updates applied per main-loop iteration when search or
+# filter results change, so typing never stalls a frame
+FRAME_BUDGET = 0.008
 
 
-def save_custom_apps():
-    """Write only custom AppEntry objects back to apps.custom."""
-    lines = []
-    for entry in apps.values():
-        if entry.custom:
-            fields = [entry.uid, entry.name, entry.category,
-                      entry.description, entry.pkg, entry.cmd]
-            lines.append("|".join(fields))
-    CUSTOM_FILE.write_text("\n".join(lines), encoding="utf-8")
+def _status_mark(entry) -> str:
+    """Short installed/not-installed marker, or a placeholder while probing."""
+    if entry.installed is None:
+        return "checking…"
+    return "✔" if entry.installed else "✖"
 
 
 # -------------------------------------------------------------------
@@ -170,6 +63,7 @@ def save_custom_apps():
 # -------------------------------------------------------------------
 
 class MainWindow(Gtk.Window):
+    @traced("gui")
     def __init__(self):
         super().__init__(title="PyStudioMusic")
         self.set_default_size(800, 500)
@@ -178,16 +72,65 @@ class MainWindow(Gtk.Window):
         # Configure header bar with title and version
         self._setup_headerbar()
 
-        # Ensure config and load catalogs
+        # Ensure config and load catalogs; archive packages are imported
+        # and install status is probed in the background once the window
+        # is on screen
         ensure_config_dir()
-        load_apps()
+        load_catalog(archive=False)
+        self._probe_gen = 0
+        self._import_pending = []
+        self._index_source = None
+
+        # Launched applications, reaped through GLib's child watch
+        self.supervisor = LaunchSupervisor(
+            lambda pid, callback: GLib.child_watch_add(GLib.PRIORITY_DEFAULT, pid, callback),
+            on_exit=self._on_app_exited)
+
+        # Optional background download of packages marked for install
+        settings = load_settings()
+        self.prefetcher = None
+        if settings["prefetch"]:
+            self.prefetcher = Prefetcher(
+                settings["prefetch_jobs"],
+                on_change=lambda _pkg, _state: GLib.idle_add(self._on_prefetch_change))
+
+        # Package transactions go through one privileged helper, started
+        # on the first Apply (None while not running)
+        self.helper_mode = settings["privileged_helper"]
+        self.helper = None
 
         # Build the stacked UI
         self._build_ui()
 
         # Show window
-        self.connect("destroy", Gtk.main_quit)
+        self.connect("delete-event", self._on_delete)
+        self.connect("destroy", self._on_destroy)
         self.show_all()
+        self._start_status_probe()
+        self._start_archive_import()
+        self._schedule_indexing()
+
+    def _on_delete(self, _win, _event):
+        """Refuse to quit while apt is running: it must not be cut off mid-way."""
+        if not self.applying:
+            return False
+        dlg = Gtk.MessageDialog(
+            transient_for=self,
+            flags=0,
+            message_type=Gtk.MessageType.WARNING,
+            buttons=Gtk.ButtonsType.OK,
+            text="Package changes are still being applied; wait for them to finish before quitting."
+        )
+        dlg.run()
+        dlg.destroy()
+        return True
+
+    def _on_destroy(self, _win):
+        if self.prefetcher is not None:
+            self.prefetcher.cancel()
+        if self.helper is not None:
+            self.helper.close()
+        Gtk.main_quit()
 
     def _setup_headerbar(self):
         """Create a modern header bar displaying the app name/version."""
@@ -197,6 +140,122 @@ class MainWindow(Gtk.Window):
         header.props.subtitle = f"v{VERSION}"
         self.set_titlebar(header)
 
+    # -------------------------------------------------------------------
+    # Background status probing
+    # -------------------------------------------------------------------
+
+    def _start_status_probe(self, entries=None):
+        """
+        Probe install status off the GTK main loop: the whole catalog
+        (superseding any probe in flight), or only the given `entries`.
+        """
+        if entries is None:
+            self._probe_gen += 1
+            entries = sorted(apps.values(), key=lambda e: e.name.lower())
+        todo = [(e.uid, e.pkg) for e in entries]
+        worker = threading.Thread(target=self._probe_worker,
+                                  args=(self._probe_gen, todo), daemon=True)
+        worker.start()
+
+    def _probe_worker(self, gen, todo):
+        """
+        Worker thread: probe everything in one pass over the dpkg database,
+        then hand the results to the UI in STATUS_BATCH slices.
+        """
+        installed = installed_packages(pkg for _, pkg in todo)
+        for start in range(0, len(todo), STATUS_BATCH):
+            batch = todo[start:start + STATUS_BATCH]
+            results = {uid: pkg in installed for uid, pkg in batch}
+            GLib.idle_add(self._on_status_batch, gen, results)
+        dependency_graph()  # keep it warm for the Remove dialog
+
+    @traced("gui")
+    def _on_status_batch(self, gen, results):
+        """Apply one batch of probe results (runs on the GTK main loop)."""
+        if gen != self._probe_gen:
+            return False  # catalog was reloaded meanwhile
+        changed = []
+        for uid, installed in results.items():
+            entry = apps.get(uid)
+            if entry is not None and (entry.installed, entry.desired) != (installed, installed):
+                entry.installed = installed
+                entry.desired = installed
+                changed.append(uid)
+        if changed:
+            self._update_store_rows(changed)
+            self._refresh_status_page()
+            self._refresh_launch_page(changed)
+            self._schedule_preview()  # pending changes depend on install status
+        return False
+
+    # -------------------------------------------------------------------
+    # Background archive import
+    # -------------------------------------------------------------------
+
+    def _start_archive_import(self):
+        """Parse the apt indexes off the main loop (see import_sections)."""
+        known = [entry.pkg for entry in apps.values()]
+        threading.Thread(target=self._import_worker, args=(self._probe_gen, known),
+                         daemon=True).start()
+
+    def _import_worker(self, gen, known):
+        """Worker thread: import the archive entries and probe them in one pass."""
+        entries = archive_entries(known)
+        installed = installed_packages(entry.pkg for entry in entries)
+        for entry in entries:
+            entry.installed = entry.desired = entry.pkg in installed
+        GLib.idle_add(self._on_archive_entries, gen, entries)
+
+    def _on_archive_entries(self, gen, entries):
+        if gen != self._probe_gen or not entries:
+            return False
+        self._import_pending = entries
+        GLib.idle_add(self._insert_archive_rows, gen)
+        return False
+
+    def _insert_archive_rows(self, gen):
+        """Add imported entries to the catalog in slices of FRAME_BUDGET."""
+        if gen != self._probe_gen:
+            return False
+        deadline = time.monotonic() + FRAME_BUDGET
+        pending = self._import_pending
+        while pending and time.monotonic() < deadline:
+            batch = pending[:64]
+            del pending[:64]
+            for entry in add_archive_entries(batch):
+                self.rows[entry.uid] = self.store.append(self._store_row(entry) + [False])
+        if pending:
+            return True
+        self._refresh_facets()
+        self._refresh_status_page()
+        self._schedule_indexing()  # shows the new rows once they are indexed
+        return False
+
+    def _schedule_indexing(self):
+        """Build the search index in FRAME_BUDGET slices while the main loop is idle."""
+        if self._index_source is None:
+            self._index_source = GLib.idle_add(self._index_step, priority=GLib.PRIORITY_LOW)
+
+    def _index_step(self):
+        if search_index.flush(FRAME_BUDGET):
+            return True
+        self._index_source = None
+        # Searches so far only saw the indexed entries: complete them
+        self._on_search_changed(self.search_entry)
+        if "launch" in self.built_pages and self.launch_search.get_text():
+            self.launch_search.emit("search-changed")
+        return False
+
+    def _refresh_packages(self, pkgs):
+        """Re-probe only the catalog entries whose package is in `pkgs`."""
+        entries = [e for e in apps.values() if e.pkg.split(":", 1)[0] in pkgs]
+        for entry in entries:
+            entry.installed = None
+        if entries:
+            self._update_store_rows([e.uid for e in entries])
+            self._start_status_probe(entries)
+
+    @traced("gui")
     def _build_ui(self):
         """Compose the main layout: side menu + stack of pages."""
         hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
@@ -214,12 +273,47 @@ class MainWindow(Gtk.Window):
         hbox.pack_start(sidebar, False, False, 0)
         hbox.pack_start(self.stack, True, True, 0)
 
-        # Add pages to the stack
-        self.stack.add_titled(self._page_manage(), "manage", "Manage Apps")
-        self.stack.add_titled(self._page_status(), "status", "Status")
-        self.stack.add_titled(self._page_launch(), "launch", "Launch Apps")
-        self.stack.add_titled(self._page_add(), "add", "Add App")
-        self.stack.add_titled(self._page_help(), "help", "Help & Info")
+        # Add an empty slot per page to the stack; each page is built the
+        # first time it is shown (see `_show_page`)
+        self.page_builders = {
+            "manage": ("Manage Apps", self._page_manage),
+            "status": ("Status", self._page_status),
+            "launch": ("Launch Apps", self._page_launch),
+            "performance": ("Performance", self._page_performance),
+            "add": ("Add App", self._page_add),
+            "diagnostics": ("Diagnostics", self._page_diagnostics),
+            "help": ("Help & Info", self._page_help),
+        }
+        self.page_slots = {}
+        self.built_pages = set()
+        self.stale_pages = set()
+        self._status_idle = None
+        for name, (title, _builder) in self.page_builders.items():
+            slot = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+            self.page_slots[name] = slot
+            self.stack.add_titled(slot, name, title)
+        self.stack.connect("notify::visible-child-name", self._on_page_switched)
+        self._show_page("manage")
+
+    def _on_page_switched(self, stack, _pspec):
+        name = stack.get_visible_child_name()
+        if name == "diagnostics" and name in self.built_pages:
+            self._fill_diagnostics()  # spans keep coming in while away
+        self._show_page(name)
+
+    def _show_page(self, name):
+        """Build a page on first view, or rebuild it if the catalog changed."""
+        if name in self.built_pages and name not in self.stale_pages:
+            return
+        slot = self.page_slots[name]
+        for child in slot.get_children():
+            child.destroy()
+        self.built_pages.add(name)
+        self.stale_pages.discard(name)
+        with tracer.span(f"page:{name}", "gui"):
+            page = self.page_builders[name][1]()
+        slot.pack_start(page, True, True, 0)
+        page.show_all()
 
     # -------------------------------------------------------------------
     # Page 1: Manage Apps (install/remove, modify catalog)
@@ -228,100 +322,466 @@ class MainWindow(Gtk.Window):
     def _page_manage(self) -> Gtk.Box:
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
 
-        # ListStore for TreeView: desired, name, category, description, installed, action
-        self.store = Gtk.ListStore(bool, str, str, str, str, object)
-        self._refresh_store()
-
-        tree = Gtk.TreeView(model=self.store)
+        # Search box and category facet above the list
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.search_entry = Gtk.SearchEntry(placeholder_text="Search name, description, package…")
+        self.search_entry.connect("search-changed", self._on_search_changed)
+        hbox.pack_start(self.search_entry, True, True, 0)
+        self.facet_combo = Gtk.ComboBoxText()
+        self.facet_combo.connect("changed", self._on_facet_changed)
+        hbox.pack_start(self.facet_combo, False, False, 0)
+        vbox.pack_start(hbox, False, False, 0)
+        self.category_filter = None
+        self.search_matches = None   # None = no search active
+        self.shown = set()           # uids whose row is meant to be visible
+        self._vis_pending = set()    # uids whose visible flag is not yet applied
+        self._vis_source = None
+
+        # ListStore for TreeView: desired, name, category, description, installed,
+        # action, uid, visible. ListStore iters persist, so `self.rows` maps
+        # uid -> TreeIter for constant-time row access. The view goes through a
+        # filter (on the visible column) and a sort model, and uses fixed-height
+        # rows so it only measures what is on screen, even with tens of
+        # thousands of entries.
+        self.store = Gtk.ListStore(bool, str, str, str, str, object, str, bool)
+        self.rows = {}
+
+        self.manage_tree = tree = Gtk.TreeView()
         tree.set_vexpand(True)
         tree.set_hexpand(True)
+        tree.connect("row-activated", self._on_row_activated)
 
         # Checkbox column for desired install state
         renderer_toggle = Gtk.CellRendererToggle()
         renderer_toggle.connect("toggled", self._on_toggle_desired)
         col_toggle = Gtk.TreeViewColumn("Install", renderer_toggle, active=0)
+        col_toggle.set_sort_column_id(0)
         tree.append_column(col_toggle)
 
         # Text columns: Name, Category, Description
         for idx, title in enumerate(["Name", "Category", "Description"], start=1):
             renderer_text = Gtk.CellRendererText()
             col = Gtk.TreeViewColumn(title, renderer_text, text=idx)
+            col.set_sort_column_id(idx)
             tree.append_column(col)
 
         # Installed status column
         renderer_status = Gtk.CellRendererText()
         col_status = Gtk.TreeViewColumn("Installed", renderer_status, text=4)
+        col_status.set_sort_column_id(4)
         tree.append_column(col_status)
 
         # Action column (e.g. "Delete" for custom entries)
         renderer_action = Gtk.CellRendererText()
-        col_action = Gtk.TreeViewColumn("Action", renderer_action, text=5)
-        tree.append_column(col_action)
+        self.col_action = Gtk.TreeViewColumn("Action", renderer_action, text=5)
+        tree.append_column(self.col_action)
+
+        for col, width in zip(tree.get_columns(), (60, 180, 110, 300, 90, 70)):
+            col.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            col.set_fixed_width(width)
+            col.set_resizable(True)
+        tree.set_fixed_height_mode(True)
+
+        self.sorted_store = None
+        self._refresh_store()
 
         scroll = Gtk.ScrolledWindow()
         scroll.add(tree)
         vbox.pack_start(scroll, True, True, 0)
 
-        btn_apply = Gtk.Button(label="Apply Changes")
-        btn_apply.connect("clicked", self._on_apply_manage)
-        vbox.pack_start(btn_apply, False, False, 0)
+        self.prefetch_label = Gtk.Label(xalign=0)
+        self.prefetch_label.set_no_show_all(True)
+        vbox.pack_start(self.prefetch_label, False, False, 0)
+
+        # Download size, disk delta and extra dependencies of the pending changes
+        self.preview_label = Gtk.Label(xalign=0, wrap=True)
+        self.preview_label.set_no_show_all(True)
+        vbox.pack_start(self.preview_label, False, False, 0)
+        self._preview_gen = 0
+        self._preview_timer = None
+
+        # Transaction progress, bounded log and controls
+        self.progress = Gtk.ProgressBar(show_text=True)
+        self.progress.set_no_show_all(True)
+        vbox.pack_start(self.progress, False, False, 0)
+
+        self.log_view = Gtk.TextView(editable=False, cursor_visible=False, monospace=True)
+        self.log_scroll = Gtk.ScrolledWindow()
+        self.log_scroll.set_size_request(-1, 120)
+        self.log_scroll.add(self.log_view)
+        self.log_scroll.set_no_show_all(True)
+        self.log_view.show()
+        vbox.pack_start(self.log_scroll, False, True, 0)
 
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.btn_apply = Gtk.Button(label="Apply Changes")
+        self.btn_apply.connect("clicked", self._on_apply_manage)
+        hbox.pack_start(self.btn_apply, True, True, 0)
+        self.btn_cancel = Gtk.Button(label="Cancel")
+        self.btn_cancel.connect("clicked", self._on_cancel_transaction)
+        self.btn_cancel.set_sensitive(False)
+        hbox.pack_start(self.btn_cancel, False, False, 0)
+        vbox.pack_start(hbox, False, False, 0)
+
+        self.transaction = None
+        self.applying = False  # from Apply until the transaction is done
         return vbox
 
+    @traced("gui")
     def _refresh_store(self):
-        """Reload ListStore from `apps` dict, sorted by name."""
+        """Reload ListStore from `apps` dict."""
+        # Fill the store detached from the filter/sort models, then rebuild
+        # them once, rather than re-sorting on every appended row
+        sort_id = (1, Gtk.SortType.ASCENDING)
+        if self.sorted_store is not None:
+            sort_id = self.sorted_store.get_sort_column_id()
+        self.manage_tree.set_model(None)
+        self.sorted_store = None
+
         self.store.clear()
-        for uid, entry in sorted(apps.items(), key=lambda kv: kv[1].name.lower()):
-            installed_mark = "✔" if entry.installed else "✖"
-            action_text = "Delete" if entry.custom else ""
-            self.store.append([
-                entry.desired,
-                entry.name,
-                entry.category,
-                entry.description,
-                installed_mark,
-                action_text
-            ])
+        self.rows = {}
+        self.search_matches = search_index.search(self.search_entry.get_text(),
+                                                  complete=False)
+        self.shown = self._visible_uids()
+        self._vis_pending.clear()
+        for uid, entry in apps.items():
+            self.rows[uid] = self.store.append(self._store_row(entry) + [uid in self.shown])
+
+        self.filtered_store = self.store.filter_new()
+        self.filtered_store.set_visible_column(7)
+        self.sorted_store = Gtk.TreeModelSort(model=self.filtered_store)
+        self.sorted_store.set_sort_column_id(*sort_id)
+        self.manage_tree.set_model(self.sorted_store)
+        self._refresh_facets()
+
+    def _refresh_facets(self):
+        """Offer every category present in the catalog as a filter."""
+        current = self.category_filter
+        categories = sorted(set(CATEGORIES) | {e.category for e in apps.values()})
+        self.facet_combo.remove_all()
+        self.facet_combo.append("", "All categories")
+        for cat in categories:
+            self.facet_combo.append(cat, cat)
+        self.facet_combo.set_active_id(current if current in categories else "")
+
+    def _on_facet_changed(self, combo):
+        self.category_filter = combo.get_active_id() or None
+        if self.sorted_store is not None:
+            self._update_visibility()
+
+    def _on_search_changed(self, entry):
+        self.search_matches = search_index.search(entry.get_text(), complete=False)
+        self._update_visibility()
+
+    def _visible_uids(self) -> set:
+        """Uids passing both the search and the category facet."""
+        uids = set(apps) if self.search_matches is None else self.search_matches
+        if self.category_filter is not None:
+            uids = uids & search_index.with_category(self.category_filter)
+        return uids
+
+    def _update_visibility(self):
+        """
+        Queue only the rows whose visibility changed; they are applied in
+        slices of FRAME_BUDGET from an idle handler.
+        """
+        target = self._visible_uids()
+        self._vis_pending |= target ^ self.shown
+        self.shown = target
+        if self._vis_pending and self._vis_source is None:
+            self._vis_source = GLib.idle_add(self._apply_visibility)
+
+    def _apply_visibility(self):
+        deadline = time.monotonic() + FRAME_BUDGET
+        pending = self._vis_pending
+        while pending and time.monotonic() < deadline:
+            for _ in range(64):
+                if not pending:
+                    break
+                uid = pending.pop()
+                if uid in self.rows:
+                    self.store.set_value(self.rows[uid], 7, uid in self.shown)
+        if pending:
+            return True
+        self._vis_source = None
+        return False
+
+    @staticmethod
+    def _store_row(entry) -> list:
+        installed_mark = _status_mark(entry)
+        action_text = "Delete" if entry.custom else ""
+        return [
+            entry.desired,
+            entry.name,
+            entry.category,
+            entry.description,
+            installed_mark,
+            action_text,
+            entry.uid
+        ]
+
+    def _update_store_rows(self, uids):
+        """Patch the desired/installed columns of the given rows in place."""
+        for uid in uids:
+            self.store.set(self.rows[uid], [0, 4],
+                           [apps[uid].desired, _status_mark(apps[uid])])
+
+    def _insert_store_row(self, uid):
+        """Add the row for a newly added entry (the view keeps it sorted)."""
+        self.rows[uid] = self.store.append(self._store_row(apps[uid]) + [False])
+        self._on_search_changed(self.search_entry)
+        self._schedule_indexing()  # searches see the entry once it is indexed
+
+    def _remove_store_row(self, uid):
+        self.store.remove(self.rows.pop(uid))
+        self.shown.discard(uid)
 
     def _on_toggle_desired(self, widget, path):
         """Toggle the 'desired' flag when user clicks a checkbox."""
-        key_list = sorted(apps.keys(), key=lambda k: apps[k].name.lower())
-        uid = key_list[int(path)]
+        uid = self.sorted_store[path][6]
+        if apps[uid].installed is None:
+            return  # status not known yet
         apps[uid].desired = not apps[uid].desired
-        self.store[path][0] = apps[uid].desired
+        self.store.set_value(self.rows[uid], 0, apps[uid].desired)
+        if self.prefetcher is not None:
+            if apps[uid].desired and not apps[uid].installed:
+                self.prefetcher.fetch(apps[uid].pkg)
+            else:
+                self.prefetcher.drop(apps[uid].pkg)
+        self._schedule_preview()
 
-    def _on_apply_manage(self, _btn):
-        """Install or remove packages based on user selection."""
+    def _pending_changes(self):
+        """Return the (to_install, to_remove) packages ticked on the Manage page."""
         to_install, to_remove = [], []
         for entry in apps.values():
             if entry.desired and not entry.installed:
                 to_install.append(entry.pkg)
             if not entry.desired and entry.installed:
                 to_remove.append(entry.pkg)
+        return to_install, to_remove
+
+    def _schedule_preview(self):
+        if self._preview_timer is not None:
+            GLib.source_remove(self._preview_timer)
+        self._preview_timer = GLib.timeout_add(PREVIEW_DELAY, self._start_preview)
+
+    def _start_preview(self):
+        """Estimate the pending changes: from the cache, or by apt-get -s off the main loop."""
+        self._preview_timer = None
+        self._preview_gen += 1
+        to_install, to_remove = self._pending_changes()
+        if not to_install and not to_remove:
+            self.preview_label.hide()
+            return False
+        plan = TransactionPlan(install=to_install, remove=to_remove)
+        estimate = estimate_plan(plan, cached_only=True)
+        if estimate is not None:
+            self._on_preview(self._preview_gen, estimate)
+            return False
+        self.preview_label.set_text("Estimating download and disk space…")
+        self.preview_label.show()
+        gen = self._preview_gen
+        threading.Thread(
+            target=lambda: GLib.idle_add(self._on_preview, gen, estimate_plan(plan)),
+            daemon=True).start()
+        return False
+
+    def _on_preview(self, gen, estimate):
+        if gen == self._preview_gen:
+            self.preview_label.set_text(estimate.describe())
+            self.preview_label.show()
+        return False
+
+    def _on_prefetch_change(self):
+        """Summarise the background downloads below the package list."""
+        states = list(self.prefetcher.states.values())
+        if not states:
+            self.prefetch_label.hide()
+            return False
+        text = f"Pre-downloaded {states.count('ready')} of {len(states)} marked package(s)"
+        busy = states.count("queued") + states.count("downloading")
+        if busy:
+            text += f", {busy} in progress"
+        if "failed" in states:
+            text += f", {states.count('failed')} left for Apply"
+        self.prefetch_label.set_text(text)
+        self.prefetch_label.show()
+        return False
+
+    def _on_row_activated(self, tree, path, column):
+        """Double-clicking "Delete" removes a custom entry from the catalog."""
+        uid = self.sorted_store[path][6]
+        if column is not self.col_action or not apps[uid].custom:
+            return
+        dlg = Gtk.MessageDialog(
+            transient_for=self,
+            flags=0,
+            message_type=Gtk.MessageType.QUESTION,
+            buttons=Gtk.ButtonsType.YES_NO,
+            text=f"Delete custom application “{apps[uid].name}” from the catalog?"
+        )
+        response = dlg.run()
+        dlg.destroy()
+        if response != Gtk.ResponseType.YES:
+            return
+        delete_custom_app(uid)
+        self._remove_store_row(uid)
+        self._refresh_status_page()
+        self._refresh_launch_page([uid])
 
-        # If any removals, ask remove vs purge
+    def _on_apply_manage(self, _btn):
+        """Install or remove packages based on user selection."""
+        to_install, to_remove = self._pending_changes()
+        if not to_install and not to_remove:
+            return
+
+        # Show the merged plan; removals get a per-package purge choice
+        prefetched = self.prefetcher.ready_files(to_install) if self.prefetcher else []
+        plan = self._confirm_plan(to_install, to_remove, prefetched)
+        if plan is not None and not plan.is_empty():
+            self._start_transaction(plan)
+
+    def _confirm_plan(self, to_install, to_remove, prefetched=()):
+        """Ask the user to confirm the transaction; return the plan or None."""
+        dlg = Gtk.Dialog(title="Apply Changes", transient_for=self, flags=0)
+        dlg.add_buttons("Cancel", Gtk.ResponseType.CANCEL,
+                        "Apply", Gtk.ResponseType.OK)
+        box = dlg.get_content_area()
+        box.set_spacing(6)
+        box.set_border_width(12)
+
+        if to_install:
+            box.pack_start(Gtk.Label(label="Install: " + ", ".join(sorted(to_install)),
+                                     xalign=0, wrap=True), False, False, 0)
+        if prefetched:
+            box.pack_start(Gtk.Label(label=f"{len(prefetched)} package file(s) already downloaded.",
+                                     xalign=0), False, False, 0)
+        estimate = estimate_plan(TransactionPlan(install=to_install, remove=to_remove),
+                                 cached_only=True)
+        if estimate is not None:
+            box.pack_start(Gtk.Label(label=estimate.describe(), xalign=0, wrap=True),
+                           False, False, 0)
+
+        purge_checks = {}
         if to_remove:
+            box.pack_start(Gtk.Label(label="Remove (tick to also purge config files):",
+                                     xalign=0), False, False, 0)
+            for pkg in sorted(to_remove):
+                cb = Gtk.CheckButton(label=f"{pkg} — purge")
+                box.pack_start(cb, False, False, 0)
+                purge_checks[pkg] = cb
+            box.pack_start(Gtk.Label(label=removal_impact(to_remove).describe(),
+                                     xalign=0, wrap=True), False, False, 0)
+
+        box.show_all()
+        response = dlg.run()
+        purge = [pkg for pkg, cb in purge_checks.items() if cb.get_active()]
+        dlg.destroy()
+        if response != Gtk.ResponseType.OK:
+            return None
+        return TransactionPlan(install=to_install, remove=to_remove, purge=purge,
+                               prefetched=prefetched)
+
+    def _start_transaction(self, plan):
+        """Run a plan in the background, streaming into the log view."""
+        if self.prefetcher is not None:
+            self.prefetcher.cancel()  # apt downloads whatever is left
+        self.log_view.get_buffer().set_text("")
+        self.progress.set_fraction(0.0)
+        self.progress.set_text("Starting…")
+        self.progress.show()
+        self.log_scroll.show()
+        self.btn_apply.set_sensitive(False)
+        self.btn_cancel.set_sensitive(True)
+        self.applying = True
+
+        self._plan_pkgs = {pkg.split(":", 1)[0]
+                           for pkg in plan.install + plan.remove + plan.purge}
+        callbacks = {
+            "on_progress": lambda f, text: GLib.idle_add(self._on_transaction_progress, f, text),
+            "on_line": lambda line: GLib.idle_add(self._append_log, line),
+            "on_done": lambda ok, msg: GLib.idle_add(self._on_transaction_done, ok, msg),
+        }
+        threading.Thread(target=self._submit_plan, args=(plan, callbacks), daemon=True).start()
+
+    def _submit_plan(self, plan, callbacks):
+        """
+        Worker thread (sudo may prompt): hand the plan to the privileged
+        helper, starting it on first use, or run it through sudo directly.
+        """
+        try:
+            transaction = None
+            if self.helper_mode:
+                try:
+                    if self.helper is None or not self.helper.alive():
+                        helper = HelperClient(fake=self.helper_mode == "fake")
+                        helper.start()
+                        self.helper = helper
+                    transaction = self.helper.transaction(plan, **callbacks)
+                except HelperError as exc:
+                    callbacks["on_line"](f"Privileged helper unavailable ({exc}); using sudo.")
+            if transaction is None:
+                transaction = AptTransaction(plan.cmds(), **callbacks)
+        except Exception as exc:  # the UI must not wait forever for on_done
+            callbacks["on_done"](False, f"Could not start the transaction: {exc}")
+            return
+        self.transaction = transaction
+        transaction.start()
+
+    def _on_transaction_progress(self, fraction, text):
+        self.progress.set_fraction(fraction)
+        self.progress.set_text(text)
+        if self.transaction is not None and self.transaction.committed:
+            self.btn_cancel.set_sensitive(False)  # dpkg must not be interrupted
+        return False
+
+    def _append_log(self, line):
+        """Append a line to the log, dropping the oldest beyond LOG_MAX_LINES."""
+        buf = self.log_view.get_buffer()
+        buf.insert(buf.get_end_iter(), line + "\n")
+        excess = buf.get_line_count() - LOG_MAX_LINES
+        if excess > 0:
+            buf.delete(buf.get_start_iter(), buf.get_iter_at_line(excess))
+        self.log_view.scroll_to_iter(buf.get_end_iter(), 0.0, False, 0.0, 1.0)
+        return False
+
+    def _on_cancel_transaction(self, _btn):
+        if self.transaction is not None:
+            self.btn_cancel.set_sensitive(False)
+            if self.transaction.committed:
+                self._append_log("Cancelling after the current step…")
+            else:
+                self._append_log("Cancelling…")
+            self.transaction.cancel()
+
+    def _on_transaction_done(self, ok, message):
+        """Re-enable controls and re-probe what apt touched once it has finished."""
+        touched = set(self._plan_pkgs)
+        if self.transaction is not None:  # None if it could not be started
+            touched |= self.transaction.touched
+        self.transaction = None
+        self.applying = False
+        self.btn_apply.set_sensitive(True)
+        self.btn_cancel.set_sensitive(False)
+        self.progress.set_text("Done" if ok else "Failed")
+
+        # Refresh only the affected entries
+        self._refresh_packages(touched)
+        if ok and self.prefetcher is not None:
+            self.prefetcher.clear()  # copied into apt's cache by now
+
+        if not ok:
+            self._append_log(message)
             dlg = Gtk.MessageDialog(
                 transient_for=self,
                 flags=0,
-                message_type=Gtk.MessageType.QUESTION,
-                buttons=Gtk.ButtonsType.NONE,
-                text="Remove or purge selected applications?"
+                message_type=Gtk.MessageType.ERROR,
+                buttons=Gtk.ButtonsType.OK,
+                text=message
             )
-            dlg.add_buttons("Remove", 1, "Purge", 2, "Cancel", 0)
-            choice = dlg.run()
+            dlg.run()
             dlg.destroy()
-            if choice == 1:
-                apt_remove(to_remove)
-            elif choice == 2:
-                apt_purge(to_remove)
-
-        if to_install:
-            apt_install(to_install)
-
-        # Reload states and update UI
-        load_apps()
-        self._refresh_store()
+        return False
 
     # -------------------------------------------------------------------
     # Page 2: Status (readonly list of installed apps)
@@ -330,63 +790,418 @@ class MainWindow(Gtk.Window):
     def _page_status(self) -> Gtk.ScrolledWindow:
         textview = Gtk.TextView()
         textview.set_editable(False)
-        buffer = textview.get_buffer()
+        self.status_buffer = textview.get_buffer()
+        self._fill_status_text()
 
-        lines = []
-        for entry in sorted(apps.values(), key=lambda e: e.name.lower()):
-            mark = "✔" if entry.installed else "✖"
-            lines.append(f"{mark} {entry.name} — {entry.category}")
-
-        buffer.set_text("\n".join(lines))
         scroll = Gtk.ScrolledWindow()
         scroll.add(textview)
         return scroll
 
+    def _fill_status_text(self):
+        """Rewrite the Status text from the current `apps` state."""
+        self._status_idle = None
+        lines = []
+        for entry in sorted(apps.values(), key=lambda e: e.name.lower()):
+            lines.append(f"{_status_mark(entry)} {entry.name} — {entry.category}")
+        self.status_buffer.set_text("\n".join(lines))
+        return False
+
+    def _refresh_status_page(self):
+        """
+        The catalog changed: rewrite the Status text once the main loop is
+        idle if the page is on screen, otherwise when it is next shown.
+        """
+        if "status" not in self.built_pages:
+            return
+        if self.stack.get_visible_child_name() != "status":
+            self.stale_pages.add("status")
+        elif self._status_idle is None:
+            self._status_idle = GLib.idle_add(self._fill_status_text)
+
     # -------------------------------------------------------------------
     # Page 3: Launch Apps (checkbox list)
     # -------------------------------------------------------------------
 
     def _page_launch(self) -> Gtk.Box:
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
-        grid = Gtk.Grid(row_spacing=4, column_spacing=4)
-        self.launch_checks = {}
-
-        row = 0
-        for entry in sorted(apps.values(), key=lambda e: e.name.lower()):
-            if entry.installed:
-                cb = Gtk.CheckButton(label=f"{entry.name} ({entry.category})")
-                grid.attach(cb, 0, row, 1, 1)
-                self.launch_checks[entry.uid] = cb
-                row += 1
+        self.launch_search = Gtk.SearchEntry(placeholder_text="Search installed applications…")
+        vbox.pack_start(self.launch_search, False, False, 0)
+        self.launch_hint = Gtk.Label(label="Checking installed applications…")
+        self.launch_hint.set_no_show_all(True)
+        vbox.pack_start(self.launch_hint, False, False, 0)
+
+        # One row per installed app: selected, label, uid, process state
+        self.launch_store = Gtk.ListStore(bool, str, str, str)
+        self.launch_rows = {}
+        self.launch_matches = None
+        filtered_launch = self.launch_store.filter_new()
+        filtered_launch.set_visible_func(
+            lambda model, it, _data: self.launch_matches is None or model[it][2] in self.launch_matches)
+        self.launch_search.connect("search-changed", self._on_launch_search_changed,
+                                   filtered_launch)
+        sorted_launch = Gtk.TreeModelSort(model=filtered_launch)
+        sorted_launch.set_sort_column_id(1, Gtk.SortType.ASCENDING)
+
+        tree = Gtk.TreeView(model=sorted_launch, headers_visible=False)
+        renderer_toggle = Gtk.CellRendererToggle()
+        renderer_toggle.connect("toggled", self._on_toggle_launch, sorted_launch)
+        col_toggle = Gtk.TreeViewColumn("", renderer_toggle, active=0)
+        col_label = Gtk.TreeViewColumn("Application", Gtk.CellRendererText(), text=1)
+        col_state = Gtk.TreeViewColumn("State", Gtk.CellRendererText(), text=3)
+        for col, width in ((col_toggle, 40), (col_label, 320), (col_state, 220)):
+            col.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            col.set_fixed_width(width)
+            tree.append_column(col)
+        tree.set_fixed_height_mode(True)
+        self.launch_tree = tree
+        self._refresh_launch_page()
 
         scroll = Gtk.ScrolledWindow()
-        scroll.add(grid)
+        scroll.add(tree)
         vbox.pack_start(scroll, True, True, 0)
 
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
         btn_launch = Gtk.Button(label="Launch Selected")
         btn_launch.connect("clicked", self._on_launch_selected)
-        vbox.pack_start(btn_launch, False, False, 0)
+        hbox.pack_start(btn_launch, True, True, 0)
+        btn_stop = Gtk.Button(label="Stop Selected")
+        btn_stop.connect("clicked", self._on_stop_selected)
+        hbox.pack_start(btn_stop, False, False, 0)
+        btn_profile = Gtk.Button(label="Launch Profile…")
+        btn_profile.connect("clicked", self._on_edit_profile)
+        hbox.pack_start(btn_profile, False, False, 0)
+        vbox.pack_start(hbox, False, False, 0)
+
+        # Named sessions: save the checked apps, bring a saved set back up
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        hbox.pack_start(Gtk.Label(label="Session:"), False, False, 0)
+        self.session_combo = Gtk.ComboBoxText()
+        hbox.pack_start(self.session_combo, True, True, 0)
+        btn_restore = Gtk.Button(label="Restore")
+        btn_restore.connect("clicked", self._on_restore_session)
+        hbox.pack_start(btn_restore, False, False, 0)
+        btn_save = Gtk.Button(label="Save Checked as Session…")
+        btn_save.connect("clicked", self._on_save_session)
+        hbox.pack_start(btn_save, False, False, 0)
+        btn_delete = Gtk.Button(label="Delete")
+        btn_delete.connect("clicked", self._on_delete_session)
+        hbox.pack_start(btn_delete, False, False, 0)
+        vbox.pack_start(hbox, False, False, 0)
+        self._refresh_sessions()
 
         return vbox
 
-    def _on_launch_selected(self, _btn):
-        """Spawn subprocesses to launch each checked application."""
-        for uid, cb in self.launch_checks.items():
-            if cb.get_active():
-                cmd = apps[uid].cmd.split()
-                subprocess.Popen(cmd)
+    def _refresh_launch_page(self, uids=None):
+        """
+        Sync the Launch list with the installed entries, keeping the user's
+        ticks: everything, or only the rows for the given `uids`. Nothing to
+        do before the page is first built, as it is built from `apps`.
+        """
+        if "launch" not in self.built_pages:
+            return
+        self.launch_hint.set_visible(any(e.installed is None for e in apps.values()))
+        for uid in set(self.launch_rows) | set(apps) if uids is None else uids:
+            entry = apps.get(uid)
+            it = self.launch_rows.get(uid)
+            if entry is not None and entry.installed and entry.cmd:
+                label = f"{entry.name} ({entry.category})"
+                if it is None:
+                    self.launch_rows[uid] = self.launch_store.append(
+                        [False, label, uid, self._process_state(uid)])
+                else:
+                    self.launch_store.set_value(it, 1, label)
+            elif it is not None:
+                self.launch_store.remove(self.launch_rows.pop(uid))
+
+    def _on_launch_search_changed(self, entry, filtered):
+        # Only installed apps are listed, so a refilter stays cheap
+        self.launch_matches = search_index.search(entry.get_text(), complete=False)
+        filtered.refilter()
+
+    def _on_toggle_launch(self, _renderer, path, model):
+        it = self.launch_rows[model[path][2]]
+        self.launch_store.set_value(it, 0, not self.launch_store[it][0])
+
+    def _process_state(self, uid) -> str:
+        pids = self.supervisor.pids(uid)
+        return f"running (pid {', '.join(map(str, pids))})" if pids else ""
+
+    def _set_launch_state(self, uid, text):
+        if uid in self.launch_rows:
+            self.launch_store.set_value(self.launch_rows[uid], 3, text)
+
+    def _on_launch_selected(self, btn):
+        """
+        Launch the checked applications: audio servers first, then, once
+        their readiness probes pass (checked off the main loop), all the
+        clients at once.
+        """
+        selected = [apps[row[2]] for row in self.launch_store if row[0]]
+        self._launch_batch(btn, *launch_groups(selected))
+
+    def _launch_batch(self, btn, servers, clients, profiles=None, session=None):
+        """
+        Start `servers` now and `clients` once the servers are ready, with
+        `profiles` ({uid: LaunchProfile}, default: the stored ones). A
+        restored `session` is named in the summary, with the time it took.
+        """
+        report = {"launched": [], "skipped": [], "failed": [], "warnings": [],
+                  "profiles": profiles or {}, "session": session,
+                  "started": time.monotonic()}
+
+        started = []
+        for entry in servers:
+            if probe_ready(readiness_probe(entry)):
+                report["skipped"].append(entry.name)  # already serving
+            elif self._launch_entry(entry, report):
+                started.append(entry)
+
+        btn.set_sensitive(False)
+
+        def wait_for_servers():
+            not_ready = wait_until_ready(started)
+            GLib.idle_add(self._launch_clients, btn, clients, report, not_ready)
+
+        threading.Thread(target=wait_for_servers, daemon=True).start()
+
+    def _launch_entry(self, entry, report) -> bool:
+        """Start one application, recording the outcome in `report`."""
+        try:
+            proc, warnings = self.supervisor.launch(entry, report["profiles"].get(entry.uid))
+        except OSError as exc:
+            report["failed"].append(f"{entry.name}: {exc.strerror or exc}")
+            self._set_launch_state(entry.uid, "failed to start")
+            return False
+        if proc is None:
+            report["skipped"].append(entry.name)
+            return False
+        report["launched"].append(entry.name)
+        report["warnings"] += [f"{entry.name}: {w}" for w in warnings]
+        self._set_launch_state(entry.uid, self._process_state(entry.uid))
+        return True
+
+    def _launch_clients(self, btn, clients, report, not_ready):
+        """Second launch stage, back on the main loop: start every client."""
+        for entry in clients:
+            self._launch_entry(entry, report)
+        btn.set_sensitive(True)
+
+        lines = []
+        if report["session"] is not None:
+            elapsed = time.monotonic() - report["started"]
+            lines.append(f"Session “{report['session']}” restored in {elapsed:.2f} s.")
+        if report["launched"]:
+            lines.append("Launched: " + ", ".join(report["launched"]))
+        if report["skipped"]:
+            lines.append("Already running (not started again): " + ", ".join(report["skipped"]))
+        if not_ready:
+            lines.append("Not ready in time (clients started anyway): "
+                         + ", ".join(e.name for e in not_ready))
+        if report["warnings"]:
+            lines.append("Launch profile not fully applied:\n" + "\n".join(report["warnings"]))
+        if report["failed"]:
+            lines.append("Could not start:\n" + "\n".join(report["failed"]))
         dlg = Gtk.MessageDialog(
             transient_for=self,
             flags=0,
-            message_type=Gtk.MessageType.INFO,
+            message_type=Gtk.MessageType.WARNING
+            if report["failed"] or report["warnings"] or not_ready
+            else Gtk.MessageType.INFO,
             buttons=Gtk.ButtonsType.OK,
-            text="Applications launched."
+            text="\n".join(lines) or "No applications selected."
         )
         dlg.run()
         dlg.destroy()
+        return False
+
+    def _refresh_sessions(self, active=None):
+        self.session_combo.remove_all()
+        for name in custom_store.session_names():
+            self.session_combo.append(name, name)
+        if active is not None:
+            self.session_combo.set_active_id(active)
+        else:
+            self.session_combo.set_active(0)
+
+    def _on_restore_session(self, btn):
+        """Bring a saved session up from its stored launch plan."""
+        name = self.session_combo.get_active_id()
+        session = custom_store.session(name) if name else None
+        if session is not None:
+            servers, clients, profiles = session.launch_plan()
+            self._launch_batch(btn, servers, clients, profiles, session=name)
+
+    def _on_save_session(self, _btn):
+        """Save the checked applications, with their launch profiles, as a session."""
+        selected = [apps[row[2]] for row in self.launch_store if row[0]]
+        dlg = Gtk.Dialog(title="Save Session", transient_for=self, flags=0)
+        dlg.add_buttons("Cancel", Gtk.ResponseType.CANCEL,
+                        "Save", Gtk.ResponseType.OK)
+        box = dlg.get_content_area()
+        box.set_spacing(6)
+        box.set_border_width(12)
+        box.pack_start(Gtk.Label(label=f"Session name for {len(selected)} checked application(s):",
+                                 xalign=0), False, False, 0)
+        name_entry = Gtk.Entry(text=self.session_combo.get_active_id() or "",
+                               activates_default=True)
+        box.pack_start(name_entry, False, False, 0)
+        dlg.set_default_response(Gtk.ResponseType.OK)
+        box.show_all()
+        response = dlg.run()
+        name = name_entry.get_text().strip()
+        dlg.destroy()
+        if response != Gtk.ResponseType.OK or not name or not selected:
+            return
+        custom_store.save_session(StudioSession.from_entries(name, selected))
+        self._refresh_sessions(active=name)
+
+    def _on_delete_session(self, _btn):
+        name = self.session_combo.get_active_id()
+        if name:
+            custom_store.delete_session(name)
+            self._refresh_sessions()
+
+    def _on_edit_profile(self, _btn):
+        """Edit the launch profile of the highlighted application."""
+        model, it = self.launch_tree.get_selection().get_selected()
+        if it is None:
+            warn = Gtk.MessageDialog(
+                transient_for=self,
+                flags=0,
+                message_type=Gtk.MessageType.WARNING,
+                buttons=Gtk.ButtonsType.OK,
+                text="Select an application in the list first."
+            )
+            warn.run()
+            warn.destroy()
+            return
+        entry = apps[model[it][2]]
+        profile = launch_profiles.get(entry.uid, LaunchProfile())
+
+        dlg = Gtk.Dialog(title=f"Launch Profile — {entry.name}", transient_for=self, flags=0)
+        dlg.add_buttons("Cancel", Gtk.ResponseType.CANCEL,
+                        "Save", Gtk.ResponseType.OK)
+        grid = Gtk.Grid(column_spacing=6, row_spacing=6, margin=12)
+        dlg.get_content_area().add(grid)
+
+        nice_check = Gtk.CheckButton(label="Nice level", active=profile.nice is not None)
+        nice_spin = Gtk.SpinButton.new_with_range(-20, 19, 1)
+        nice_spin.set_value(profile.nice or 0)
+        rt_spin = Gtk.SpinButton.new_with_range(0, 99, 1)
+        rt_spin.set_value(profile.rt_priority)
+        cpus_entry = Gtk.Entry(text=",".join(map(str, profile.cpus)),
+                               placeholder_text="any CPU, e.g. 2,3")
+        io_combo = Gtk.ComboBoxText()
+        for io_class in ("inherit", *LaunchProfile.IO_CLASSES):
+            io_combo.append(io_class, io_class)
+        io_combo.set_active_id(profile.io_class or "inherit")
+        io_spin = Gtk.SpinButton.new_with_range(0, 7, 1)
+        io_spin.set_value(profile.io_priority)
+        env_entry = Gtk.Entry(text=" ".join(f"{k}={v}" for k, v in profile.env.items()),
+                              placeholder_text="e.g. PIPEWIRE_QUANTUM=128/48000")
+
+        rows = (
+            (nice_check, nice_spin),
+            (Gtk.Label(label="Real-time priority (0 = off)", xalign=0), rt_spin),
+            (Gtk.Label(label="CPUs", xalign=0), cpus_entry),
+            (Gtk.Label(label="I/O class", xalign=0), io_combo),
+            (Gtk.Label(label="I/O priority", xalign=0), io_spin),
+            (Gtk.Label(label="Environment", xalign=0), env_entry),
+        )
+        for row, (label, widget) in enumerate(rows):
+            grid.attach(label, 0, row, 1, 1)
+            grid.attach(widget, 1, row, 1, 1)
+        dlg.show_all()
+
+        while dlg.run() == Gtk.ResponseType.OK:
+            cpus = cpus_entry.get_text().replace(",", " ").split()
+            env = [item.partition("=") for item in env_entry.get_text().split()]
+            if not all(cpu.isdigit() for cpu in cpus) or not all(k and sep for k, sep, _v in env):
+                warn = Gtk.MessageDialog(
+                    transient_for=self,
+                    flags=0,
+                    message_type=Gtk.MessageType.WARNING,
+                    buttons=Gtk.ButtonsType.OK,
+                    text="CPUs must be numbers and environment entries NAME=VALUE."
+                )
+                warn.run()
+                warn.destroy()
+                continue
+            io_class = io_combo.get_active_id()
+            set_launch_profile(entry.uid, LaunchProfile(
+                nice=nice_spin.get_value_as_int() if nice_check.get_active() else None,
+                rt_priority=rt_spin.get_value_as_int(),
+                cpus=map(int, cpus),
+                io_class=None if io_class == "inherit" else io_class,
+                io_priority=io_spin.get_value_as_int(),
+                env={k: v for k, _sep, v in env},
+            ))
+            break
+        dlg.destroy()
+
+    def _on_stop_selected(self, _btn):
+        for row in self.launch_store:
+            if row[0] and self.supervisor.is_running(row[2]):
+                self.supervisor.stop(row[2])
+
+    def _on_app_exited(self, uid, pid, returncode):
+        """Child-watch callback: show how a launched application ended."""
+        state = self._process_state(uid) or describe_exit(returncode)
+        if "launch" in self.built_pages:
+            self._set_launch_state(uid, state)
 
     # -------------------------------------------------------------------
-    # Page 4: Add Custom App
+    # Page 4: Performance (low-latency system audit)
+    # -------------------------------------------------------------------
+
+    def _page_performance(self) -> Gtk.Box:
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+
+        # One row per check: result mark, title, finding, suggested fix
+        self.audit_store = Gtk.ListStore(str, str, str, str)
+        self.audit_rows = {}
+        self._audit_gen = 0
+        tree = Gtk.TreeView(model=self.audit_store)
+        tree.set_tooltip_column(3)
+        for title, column, width in (("", 0, 80), ("Check", 1, 200), ("Finding", 2, 240)):
+            col = Gtk.TreeViewColumn(title, Gtk.CellRendererText(), text=column)
+            col.set_min_width(width)
+            tree.append_column(col)
+        fix_renderer = Gtk.CellRendererText(wrap_width=320)
+        tree.append_column(Gtk.TreeViewColumn("Suggested fix", fix_renderer, text=3))
+
+        scroll = Gtk.ScrolledWindow()
+        scroll.add(tree)
+        vbox.pack_start(scroll, True, True, 0)
+
+        btn_rerun = Gtk.Button(label="Run Audit Again")
+        btn_rerun.connect("clicked", lambda _btn: self._start_audit())
+        vbox.pack_start(btn_rerun, False, False, 0)
+
+        self._start_audit()
+        return vbox
+
+    def _start_audit(self):
+        """Re-run every check off the main loop; rows fill in as checks finish."""
+        self._audit_gen += 1
+        self.audit_store.clear()
+        for key, title, _check in AUDIT_CHECKS:
+            self.audit_rows[key] = self.audit_store.append(["checking…", title, "", ""])
+        gen = self._audit_gen
+        threading.Thread(
+            target=run_audit,
+            kwargs={"on_result": lambda result: GLib.idle_add(self._on_audit_result, gen, result)},
+            daemon=True).start()
+
+    def _on_audit_result(self, gen, result):
+        if gen == self._audit_gen:
+            mark = {True: "✔ pass", False: "✖ fail", None: "? unknown"}[result.ok]
+            self.audit_store.set(self.audit_rows[result.key], [0, 2, 3],
+                                 [mark, result.detail, result.fix])
+        return False
+
+    # -------------------------------------------------------------------
+    # Page 5: Add Custom App
     # -------------------------------------------------------------------
 
     def _page_add(self) -> Gtk.Grid:
@@ -449,24 +1264,113 @@ class MainWindow(Gtk.Window):
             dlg.destroy()
             return
 
-        # Create and persist custom entry
-        apps[uid] = AppEntry(uid, name, category, description, pkg, cmd, custom=True)
-        save_custom_apps()
-        load_apps()
-        self._refresh_store()
+        # Create and persist custom entry, then probe just its package
+        add_custom_app(AppEntry(uid, name, category, description, pkg, cmd, custom=True))
+        self._insert_store_row(uid)
+        self._start_status_probe([apps[uid]])
 
         dlg = Gtk.MessageDialog(
             transient_for=self,
             flags=0,
             message_type=Gtk.MessageType.INFO,
             buttons=Gtk.ButtonsType.OK,
-            text="Custom application added. Restart to see changes."
+            text="Custom application added."
         )
         dlg.run()
         dlg.destroy()
 
     # -------------------------------------------------------------------
-    # Page 5: Help & Info
+    # Page 6: Diagnostics (timing spans)
+    # -------------------------------------------------------------------
+
+    def _page_diagnostics(self) -> Gtk.Box:
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        hbox.pack_start(Gtk.Label(label="Record timings"), False, False, 0)
+        switch = Gtk.Switch(active=tracer.enabled)
+        switch.connect("notify::active", self._on_trace_switched)
+        hbox.pack_start(switch, False, False, 0)
+        self.trace_label = Gtk.Label(xalign=1)
+        hbox.pack_end(self.trace_label, True, True, 0)
+        vbox.pack_start(hbox, False, False, 0)
+
+        # One row per span name: name, category, calls, total ms, max ms
+        self.trace_store = Gtk.ListStore(str, str, int, float, float)
+        self.trace_store.set_sort_column_id(3, Gtk.SortType.DESCENDING)
+        tree = Gtk.TreeView(model=self.trace_store)
+        for idx, title in enumerate(["Span", "Category", "Calls", "Total (ms)", "Max (ms)"]):
+            renderer = Gtk.CellRendererText()
+            col = Gtk.TreeViewColumn(title, renderer, text=idx)
+            if idx >= 3:
+                col.set_cell_data_func(renderer, self._format_ms, idx)
+            col.set_sort_column_id(idx)
+            col.set_resizable(True)
+            tree.append_column(col)
+        scroll = Gtk.ScrolledWindow()
+        scroll.add(tree)
+        vbox.pack_start(scroll, True, True, 0)
+
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        for label, handler in (("Refresh", lambda _btn: self._fill_diagnostics()),
+                               ("Clear", self._on_clear_trace),
+                               ("Export Chrome Trace…", self._on_export_trace)):
+            btn = Gtk.Button(label=label)
+            btn.connect("clicked", handler)
+            hbox.pack_start(btn, True, True, 0)
+        vbox.pack_start(hbox, False, False, 0)
+
+        self._fill_diagnostics()
+        return vbox
+
+    @staticmethod
+    def _format_ms(_col, renderer, model, it, idx):
+        renderer.set_property("text", f"{model[it][idx]:.1f}")
+
+    def _fill_diagnostics(self):
+        self.trace_store.clear()
+        for row in tracer.summary():
+            self.trace_store.append(list(row))
+        state = "on" if tracer.enabled else "off"
+        self.trace_label.set_text(f"Tracing {state}: {len(tracer.events)} spans recorded "
+                                  f"(last {tracer.events.maxlen} kept)")
+
+    def _on_trace_switched(self, switch, _pspec):
+        tracer.enabled = switch.get_active()
+        self._fill_diagnostics()
+
+    def _on_clear_trace(self, _btn):
+        tracer.clear()
+        self._fill_diagnostics()
+
+    def _on_export_trace(self, _btn):
+        """Save the recorded spans for chrome://tracing or ui.perfetto.dev."""
+        dlg = Gtk.FileChooserDialog(title="Export Chrome Trace", transient_for=self,
+                                    action=Gtk.FileChooserAction.SAVE)
+        dlg.add_buttons("Cancel", Gtk.ResponseType.CANCEL,
+                        "Save", Gtk.ResponseType.OK)
+        dlg.set_do_overwrite_confirmation(True)
+        dlg.set_current_name("pystudiomusic-trace.json")
+        response = dlg.run()
+        path = dlg.get_filename()
+        dlg.destroy()
+        if response != Gtk.ResponseType.OK or not path:
+            return
+        try:
+            tracer.export(path)
+        except OSError as exc:
+            err = Gtk.MessageDialog(
+                transient_for=self,
+                flags=0,
+                message_type=Gtk.MessageType.ERROR,
+                buttons=Gtk.ButtonsType.OK,
+                text=f"Could not write {path}: {exc.strerror or exc}"
+            )
+            err.run()
+            err.destroy()
+
+    # -------------------------------------------------------------------
+    # Page 7: Help & Info
     # -------------------------------------------------------------------
 
     def _page_help(self) -> Gtk.ScrolledWindow:
@@ -483,13 +1387,21 @@ and music‐production software. Navigate the sections on the left:
 • Manage Apps — install, remove or purge your catalog.
 • Status      — quick overview of installed software.
 • Launch Apps — run multiple applications at once.
+• Performance — check the system for common causes of xruns.
 • Add App     — add your own entries to the catalog.
+• Diagnostics — where the time goes (start with PYSTUDIOMUSIC_TRACE=1).
 • Help & Info — you’re here.
 
 Configuration directory:
     {CONFIG_DIR}
-Custom applications file:
-    {CUSTOM_FILE}
+Custom applications database:
+    {CUSTOM_DB}
+Install-status cache:
+    {STATUS_CACHE_FILE}
+Imported apt index cache:
+    {IMPORT_CACHE_FILE}
+Settings (e.g. "update_policy": "age" | "session" | "always"):
+    {SETTINGS_FILE}
 
 © 2025 Luca Bocaletto — GPLv3
 """
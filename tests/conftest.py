@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# core.py and helper.py live at the top of the tree; keep the tests away
+# from the real ~/.pystudiomusic (core reads HOME when imported)
+sys.path.insert(0, str(ROOT))
+os.environ["HOME"] = tempfile.mkdtemp(prefix="pystudiomusic-tests-")
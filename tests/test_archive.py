@@ -0,0 +1,69 @@
+import pytest
+
+from core import _parse_packages_index, compare_versions
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("1.0", "1.0", 0),
+    ("1.0", "1.1", -1),
+    ("1.10", "1.9", 1),
+    ("1.0~rc1", "1.0", -1),
+    ("1.0", "1.0+dfsg", -1),
+    ("1:0.9", "2.0", 1),
+    ("2.0-1", "2.0-1ubuntu1", -1),
+    ("8.5.1-1", "8.5.1-1", 0),
+])
+def test_compare_versions(a, b, expected):
+    result = compare_versions(a, b)
+    assert (result > 0) - (result < 0) == expected
+    assert (compare_versions(b, a) > 0) - (compare_versions(b, a) < 0) == -expected
+
+
+PACKAGES = """\
+Package: zynaddsubfx
+Section: universe/sound
+Version: 3.0.5-1
+Installed-Size: 4096
+Description: Realtime software synthesizer
+ Long description, not kept.
+
+Package: zynaddsubfx
+Section: universe/sound
+Version: 3.0.6-2
+Installed-Size: 4200
+Description: Realtime software synthesizer
+
+Package: zynaddsubfx
+Section: universe/sound
+Version: 3.0.6-1
+Installed-Size: 4100
+Description: Realtime software synthesizer
+
+Package: vim
+Section: editors
+Version: 9.0
+Installed-Size: 3000
+Description: Vi IMproved
+
+Package: hydrogen
+Section: sound
+Version: 1.2.3-1
+Installed-Size: bogus
+Description: Advanced drum machine
+"""
+
+
+def test_packages_index_keeps_sections_and_newest_version(tmp_path):
+    index = tmp_path / "Packages"
+    index.write_text(PACKAGES, encoding="utf-8")
+    assert _parse_packages_index(index, {"sound"}) == {
+        "zynaddsubfx": ["3.0.6-2", 4200, "Realtime software synthesizer"],
+        "hydrogen": ["1.2.3-1", 0, "Advanced drum machine"],
+    }
+    assert list(_parse_packages_index(index, {"editors"})) == ["vim"]
+
+
+def test_empty_packages_index(tmp_path):
+    index = tmp_path / "Packages"
+    index.touch()
+    assert _parse_packages_index(index, {"sound"}) == {}
@@ -0,0 +1,52 @@
+import gzip
+
+import pytest
+
+from core import AUDIT_CHECKS, run_audit
+
+LIMITS = """\
+Limit                     Soft Limit           Hard Limit           Units
+Max locked memory         {memlock:<20} {memlock:<20} bytes
+Max realtime priority     {rtprio:<20} {rtprio:<20}
+"""
+
+
+def make_root(root, tuned):
+    """A fake / with procfs, sysfs and /etc: tuned for audio or a stock desktop."""
+    files = {
+        "proc/self/limits": LIMITS.format(memlock="unlimited" if tuned else "8388608",
+                                          rtprio=95 if tuned else 0),
+        "proc/sys/vm/swappiness": "10" if tuned else "60",
+        "proc/cmdline": "BOOT_IMAGE=/vmlinuz ro quiet" + (" threadirqs preempt=full" if tuned else ""),
+        "proc/sys/kernel/osrelease": "6.8.0-test",
+        "proc/self/status": "Name:\tpytest\nGroups:\t27 29 100\n" if tuned else "Groups:\t100\n",
+        "etc/group": "audio:x:29:\n",
+    }
+    for cpu in range(2):
+        files[f"sys/devices/system/cpu/cpu{cpu}/cpufreq/scaling_governor"] = (
+            "performance" if tuned else "powersave")
+    for path, text in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(text + "\n", encoding="utf-8")
+    config = ("CONFIG_PREEMPT_DYNAMIC=y\nCONFIG_HZ=1000\n" if tuned
+              else "CONFIG_PREEMPT_VOLUNTARY=y\nCONFIG_HZ=250\n")
+    with gzip.open(root / "proc/config.gz", "wt", encoding="utf-8") as fh:
+        fh.write(config)
+    return root
+
+
+@pytest.mark.parametrize("tuned", [True, False])
+def test_audit_fixture_tree(tmp_path, tuned):
+    seen = []
+    results = run_audit(make_root(tmp_path, tuned), on_result=seen.append)
+    assert [r.key for r in results] == [key for key, _title, _check in AUDIT_CHECKS]
+    assert sorted(r.key for r in seen) == sorted(r.key for r in results)
+    for result in results:
+        assert result.ok is tuned, result.to_dict()
+        assert bool(result.fix) is not tuned
+
+
+def test_audit_empty_root_is_unknown_not_failed(tmp_path):
+    results = {r.key: r for r in run_audit(tmp_path)}
+    for key in ("governor", "preemption", "rtprio", "memlock", "swappiness", "audio", "hz"):
+        assert results[key].ok is None, results[key].to_dict()
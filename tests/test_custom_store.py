@@ -0,0 +1,30 @@
+from core import CustomStore
+
+
+def test_legacy_file_is_imported_once(tmp_path):
+    legacy = tmp_path / "apps.custom"
+    legacy.write_text(
+        "my_synth|My Synth|Synth|Pads | leads|mysynth|mysynth --jack\n"
+        "my_fx|My FX|Effects|Reverb|myfx|myfx\n"
+        "not enough|fields\n",
+        encoding="utf-8")
+    store = CustomStore(tmp_path / "apps.db", legacy)
+    entries = {e.uid: e for e in store.entries()}
+    assert sorted(entries) == ["my_fx", "my_synth"]
+    synth = entries["my_synth"]
+    assert synth.description == "Pads | leads"
+    assert (synth.pkg, synth.cmd) == ("mysynth", "mysynth --jack")
+    assert entries["my_fx"].custom
+    assert not legacy.exists()
+    assert (tmp_path / "apps.custom.imported").exists()
+
+    # A later start reads the database, not the renamed file
+    again = CustomStore(tmp_path / "apps.db", legacy)
+    assert sorted(e.uid for e in again.entries()) == ["my_fx", "my_synth"]
+
+
+def test_empty_store_creates_no_database(tmp_path):
+    store = CustomStore(tmp_path / "apps.db", tmp_path / "apps.custom")
+    assert list(store.entries()) == []
+    assert store.profiles() == {}
+    assert not (tmp_path / "apps.db").exists()
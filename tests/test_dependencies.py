@@ -0,0 +1,59 @@
+import pytest
+
+from core import DependencyGraph
+
+
+DPKG_STATUS = """\
+Package: jackd2
+Status: hold ok installed
+Provides: jack-daemon
+Depends: libjack-jackd2-0 (= 1.9.22) | libjack-0.125, libc6 (>= 2.34)
+Description: JACK server
+ Continuation: not a field
+
+Package: libjack-jackd2-0
+Status: install ok installed
+Provides: libjack-0.125
+
+Package: pipewire-jack
+Status: install ok installed
+Provides: libjack-0.125, jack-daemon
+
+Package: ardour
+Status: install ok installed
+Depends: libjack-jackd2-0 | libjack-0.125
+
+Package: qjackctl
+Status: install ok installed
+Pre-Depends: jack-daemon:any
+
+Package: carla
+Status: install ok installed
+Depends: qjackctl
+
+Package: lmms
+Status: deinstall ok config-files
+Depends: jackd2
+"""
+
+
+@pytest.fixture
+def graph(tmp_path):
+    status = tmp_path / "status"
+    status.write_text(DPKG_STATUS, encoding="utf-8")
+    return DependencyGraph.from_status(status)
+
+
+def test_dependents_follow_virtual_packages_and_cascade(graph):
+    # pipewire-jack still provides jack-daemon and libjack-0.125
+    assert graph.dependents(["jackd2"]) == []
+    assert graph.dependents(["jackd2", "pipewire-jack"]) == ["carla", "qjackctl"]
+    # jackd2 goes too, and with it the last jack-daemon
+    assert graph.dependents(["libjack-jackd2-0", "pipewire-jack"]) == [
+        "ardour", "carla", "jackd2", "qjackctl"]
+
+
+def test_dependents_ignore_packages_not_installed(graph):
+    assert "lmms" not in graph.depends
+    # libc6 is not in the status file: jackd2's unmet clause is not our doing
+    assert graph.dependents(["libc6"]) == []
@@ -0,0 +1,82 @@
+import os
+import stat
+
+import pytest
+
+import core
+from core import PlanEstimate, TransactionPlan, estimate_plan
+
+SIMULATION = """\
+Reading package lists...
+The following NEW packages will be installed:
+  carla libcarla0
+Need to get 1,234 kB/2,000 kB of archives.
+After this operation, 5.5 MB of additional disk space will be used.
+Inst libcarla0 (2.5.8-1 Ubuntu:24.04/noble [amd64])
+Inst carla (2.5.8-1 Ubuntu:24.04/noble [amd64])
+Remv pulseaudio-module-jack:amd64 [1:16.1]
+Remv qjackctl [0.9.12-1]
+Conf libcarla0 (2.5.8-1 Ubuntu:24.04/noble [amd64])
+"""
+
+
+@pytest.fixture
+def stub_apt(tmp_path, monkeypatch):
+    """An apt-get on PATH that prints `tmp_path/output` and exits with `tmp_path/status`."""
+    path = tmp_path / "apt-get"
+    path.write_text('#!/bin/sh\nd="$(dirname "$0")"\necho "$@" > "$d/argv"\n'
+                    'cat "$d/output"\nexit "$(cat "$d/status")"\n', encoding="utf-8")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(core, "_estimate_cache", {})
+
+    def answer(output, status=0):
+        (tmp_path / "output").write_text(output, encoding="utf-8")
+        (tmp_path / "status").write_text(str(status), encoding="utf-8")
+    return answer
+
+
+def test_simulation_is_parsed(stub_apt, tmp_path):
+    stub_apt(SIMULATION)
+    estimate = estimate_plan(TransactionPlan(install=["carla"], remove=["qjackctl"]))
+    assert (tmp_path / "argv").read_text().split() == ["-s", "install", "carla", "qjackctl-"]
+    assert estimate.to_dict() == {
+        "download": 1234000, "disk": 5500000, "extra_install": ["libcarla0"],
+        "extra_remove": ["pulseaudio-module-jack"], "error": ""}
+    assert estimate.describe() == ("Download 1.2 MB, disk +5.5 MB; also installs 1: libcarla0;"
+                                   " also removes 1: pulseaudio-module-jack")
+
+
+def test_freed_space_is_negative(stub_apt):
+    stub_apt("Remv qjackctl [0.9.12-1]\n"
+             "After this operation, 812 kB disk space will be freed.\n")
+    estimate = estimate_plan(TransactionPlan(remove=["qjackctl"]))
+    assert estimate.disk == -812000
+    assert estimate.download is None
+    assert estimate.extra_remove == []
+
+
+def test_apt_errors_are_reported(stub_apt):
+    stub_apt("E: Unable to locate package no-such-synth\nE: second error\n", status=100)
+    estimate = estimate_plan(TransactionPlan(install=["no-such-synth"]))
+    assert estimate.error == "Unable to locate package no-such-synth"
+    assert estimate.describe().startswith("apt cannot apply these changes:")
+
+    stub_apt("", status=1)
+    assert estimate_plan(TransactionPlan(install=["carla"])).error == \
+        "apt-get exited with status 1"
+
+
+def test_estimates_are_cached_per_pending_set(stub_apt, tmp_path):
+    plan = TransactionPlan(install=["carla"])
+    assert estimate_plan(plan, cached_only=True) is None
+    stub_apt(SIMULATION)
+    first = estimate_plan(plan)
+    (tmp_path / "argv").unlink()
+    assert estimate_plan(TransactionPlan(install=["carla"])) is first
+    assert estimate_plan(plan, cached_only=True) is first
+    assert not (tmp_path / "argv").exists()
+
+
+def test_size_is_not_reported():
+    assert PlanEstimate().describe() == "Size not reported by apt"
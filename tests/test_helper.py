@@ -0,0 +1,132 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import helper
+from conftest import ROOT
+
+
+def test_request_parse_accepts_valid_apply(tmp_path, monkeypatch):
+    monkeypatch.delenv("SUDO_UID", raising=False)
+    deb = tmp_path / "carla_2.5_amd64.deb"
+    deb.write_bytes(b"!<arch>\n")
+    request = helper.Request.parse({"op": "apply", "id": 7, "install": ["carla", "jackd2:amd64"],
+                                    "remove": ["lmms"], "prefetched": [str(deb)],
+                                    "update": 1})
+    assert (request.id, request.install, request.remove, request.purge) == (
+        7, ["carla", "jackd2:amd64"], ["lmms"], [])
+    assert request.prefetched == [str(deb)] and request.update is True
+
+
+@pytest.mark.parametrize("message", [
+    {"id": 1, "install": ["-oAPT::Get::Whatever=1"]},
+    {"id": 1, "install": ["ardour; rm -rf /"]},
+    {"id": 1, "remove": "ardour"},
+    {"id": 1, "purge": [3]},
+    {"install": ["ardour"]},
+])
+def test_request_parse_rejects_unsafe_messages(message):
+    with pytest.raises((KeyError, ValueError)):
+        helper.Request.parse(message)
+
+
+def test_request_parse_drops_unusable_archives(tmp_path, monkeypatch):
+    monkeypatch.delenv("SUDO_UID", raising=False)
+    good = tmp_path / "real.deb"
+    good.write_bytes(b"")
+    link = tmp_path / "link.deb"
+    link.symlink_to(good)
+    request = helper.Request.parse({"id": 1, "install": ["carla"], "prefetched": [
+        "relative.deb", "/etc/passwd", str(tmp_path / "gone.deb"), str(link), 3, str(good)]})
+    assert request.install == ["carla"] and request.prefetched == [str(good)]
+    assert helper.Request.parse({"id": 1, "prefetched": "x.deb"}).prefetched == []
+
+
+def test_merge_later_request_wins():
+    first = helper.Request.parse({"id": 1, "install": ["ardour", "lmms"]})
+    second = helper.Request.parse({"id": 2, "remove": ["lmms"], "purge": ["qsynth"],
+                                   "update": True})
+    plan = helper.merge([first, second])
+    assert (plan.install, plan.remove, plan.purge) == (["ardour"], ["lmms"], ["qsynth"])
+    assert plan.update is True
+
+
+class FakeHelper:
+    """`helper.py --fake` in a subprocess, logging its runs under `tmp_path`."""
+
+    def __init__(self, tmp_path, delay=0.3):
+        self.log = tmp_path / "runs.jsonl"
+        self.proc = subprocess.Popen([sys.executable, str(ROOT / "helper.py"), "--fake",
+                                      "--fake-delay", str(delay), "--fake-log", str(self.log)],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.events = []
+        self.read_until(lambda event: event.get("event") == "hello")
+
+    def send(self, *messages):
+        for message in messages:
+            self.proc.stdin.write(json.dumps(message) + "\n")
+        self.proc.stdin.flush()
+
+    def read_until(self, predicate):
+        for line in self.proc.stdout:
+            self.events.append(json.loads(line))
+            if predicate(self.events[-1]):
+                return
+
+    def finish(self):
+        """Shut the helper down; return {id: done event} and the logged runs."""
+        self.send({"op": "shutdown"})
+        self.proc.stdin.close()
+        self.read_until(lambda event: False)
+        assert self.proc.wait(timeout=10) == 0
+        runs = [json.loads(line) for line in self.log.read_text().splitlines()]
+        return {e["id"]: e for e in self.events if e.get("event") == "done"}, runs
+
+
+def test_fake_helper_batches_requests_into_one_run(tmp_path):
+    fake = FakeHelper(tmp_path)
+    assert fake.events[0]["protocol"] == helper.HELPER_PROTOCOL
+    fake.send({"op": "apply", "id": 1, "install": ["ardour"]},
+              {"op": "apply", "id": 2, "install": ["qsynth"], "remove": ["lmms"]},
+              {"op": "apply", "id": 3, "install": ["bad name"]})
+    done, runs = fake.finish()
+    assert runs == [{"install": ["ardour", "qsynth"], "remove": ["lmms"], "purge": [],
+                     "update": False}]
+    assert done[1]["ok"] and done[2]["ok"]
+    assert done[1]["touched"] == ["ardour", "lmms", "qsynth"]
+    assert not done[3]["ok"] and "Rejected" in done[3]["message"]
+
+
+def test_fake_helper_queues_requests_behind_a_running_batch(tmp_path):
+    fake = FakeHelper(tmp_path)
+    fake.send({"op": "apply", "id": 1, "install": ["ardour", "carla"]})
+    fake.read_until(lambda event: event.get("event") == "line")  # first run under way
+    fake.send({"op": "apply", "id": 2, "install": ["qsynth"]},
+              {"op": "apply", "id": 3, "install": ["lmms"]})
+    done, runs = fake.finish()
+    assert [run["install"] for run in runs] == [["ardour", "carla"], ["lmms", "qsynth"]]
+    assert all(event["ok"] for event in done.values())
+
+
+def test_fake_helper_cancels_a_queued_request(tmp_path):
+    fake = FakeHelper(tmp_path)
+    fake.send({"op": "apply", "id": 1, "install": ["ardour", "carla"]})
+    fake.read_until(lambda event: event.get("event") == "line")
+    fake.send({"op": "apply", "id": 2, "install": ["qsynth"]}, {"op": "cancel", "id": 2})
+    done, runs = fake.finish()
+    assert runs == [{"install": ["ardour", "carla"], "remove": [], "purge": [], "update": False}]
+    assert done[1]["ok"] and not done[2]["ok"]
+
+
+def test_fake_helper_finishes_the_run_and_exits_when_the_client_goes_away(tmp_path):
+    fake = FakeHelper(tmp_path)
+    fake.send({"op": "apply", "id": 1, "install": ["ardour", "carla", "qsynth"]})
+    fake.read_until(lambda event: event.get("event") == "line")
+    fake.proc.stdout.close()
+    fake.send({"op": "apply", "id": 2, "install": ["lmms"]}, {"op": "shutdown"})
+    fake.proc.stdin.close()
+    assert fake.proc.wait(timeout=10) == 0
+    runs = [json.loads(line) for line in fake.log.read_text().splitlines()]
+    assert [run["install"] for run in runs] == [["ardour", "carla", "qsynth"]]
@@ -0,0 +1,34 @@
+import shutil
+
+import pytest
+
+import core
+from core import LaunchProfile
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    """Pretend the tools in the returned set are installed, and nothing else."""
+    installed = {"chrt", "taskset", "ionice", "nice"}
+    monkeypatch.setattr(shutil, "which", lambda tool: f"/usr/bin/{tool}" if tool in installed else None)
+    monkeypatch.setattr(core, "_rlimit", lambda which, unlimited: unlimited)
+    return installed
+
+
+def test_wrap_prefixes_every_setting(tools):
+    profile = LaunchProfile(rt_priority=70, cpus=[3, 2], io_class="idle")
+    argv, warnings = profile.wrap(["ardour"])
+    assert argv == ["chrt", "-f", "70", "taskset", "-c", "2,3", "ionice", "-c", "3", "ardour"]
+    assert warnings == []
+
+
+def test_wrap_skips_only_the_missing_tool(tools):
+    tools.discard("ionice")
+    profile = LaunchProfile(rt_priority=70, cpus=[2], io_class="best-effort", io_priority=0)
+    argv, warnings = profile.wrap(["ardour", "-n"])
+    assert argv == ["chrt", "-f", "70", "taskset", "-c", "2", "ardour", "-n"]
+    assert warnings == ["ionice not found, I/O class skipped"]
+
+
+def test_default_profile_leaves_argv_alone(tools):
+    assert LaunchProfile().wrap(["qsynth"]) == (["qsynth"], [])
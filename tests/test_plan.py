@@ -0,0 +1,29 @@
+import core
+from core import TransactionPlan
+
+
+def test_plan_merges_into_one_apt_run():
+    plan = TransactionPlan(install=["ardour", "ardour"], remove=["lmms"], update=False)
+    assert plan.cmds() == [["sudo", "apt-get", "install", "-y", "ardour", "lmms-"]]
+
+
+def test_plan_update_prefetch_and_purge_only():
+    plan = TransactionPlan(install=["carla"], purge=["lmms"], prefetched=["/tmp/carla.deb"],
+                           update=True)
+    assert plan.cmds(sudo=False) == [
+        ["apt-get", "update", "-qq"],
+        ["cp", "--", "/tmp/carla.deb", f"{core.APT_ARCHIVES_DIR}/"],
+        ["apt-get", "install", "-y", "--purge", "carla", "lmms-"],
+    ]
+
+
+def test_plan_mixed_remove_and_purge():
+    plan = TransactionPlan(remove=["lmms", "qsynth"], purge=["qsynth"], update=True)
+    # Nothing to install: no index refresh; purge wins over remove
+    assert plan.remove == ["lmms"]
+    assert plan.cmds() == [["sudo", "apt-get", "install", "-y", "lmms-", "qsynth-"],
+                           ["sudo", "dpkg", "--purge", "qsynth"]]
+
+
+def test_empty_plan_has_no_commands():
+    assert TransactionPlan(update=True).cmds() == []
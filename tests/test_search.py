@@ -0,0 +1,56 @@
+from core import AppEntry, SearchIndex
+
+
+def entry(uid, name, description, category="Synthesizer"):
+    return AppEntry(uid, name, category, description, uid, "")
+
+
+def make_index():
+    index = SearchIndex()
+    index.reset([entry("zyn", "ZynAddSubFX", "Software synthesizer"),
+                 entry("dragonfly", "Dragonfly Reverb", "Tape-style reverb plugins", "Effect"),
+                 entry("ardour", "Ardour", "Digital audio workstation", "DAW")])
+    return index
+
+
+def test_empty_query_matches_nothing_in_particular():
+    assert make_index().search("  ") is None
+
+
+def test_terms_match_substrings_and_word_prefixes():
+    index = make_index()
+    assert index.search("synth") == {"zyn"}
+    assert index.search("verb") == {"dragonfly"}
+    assert index.search("syn") == {"zyn"}
+    assert index.search("d") == {"dragonfly", "ardour"}      # word prefix
+    assert index.search("reverb tape") == {"dragonfly"}      # every term must match
+    assert index.search("reverb daw") == set()
+    assert index.search("tapereverb") == set()               # trigrams alone are not enough
+
+
+def test_add_remove_and_categories():
+    index = make_index()
+    index.add(entry("calf", "Calf Reverb", "Reverb plugin", "Effect"))
+    assert index.search("reverb") == {"dragonfly", "calf"}
+    assert index.with_category("Effect") == {"dragonfly", "calf"}
+    index.add(entry("calf", "Calf Chorus", "Chorus plugin", "Effect"))   # re-added: replaced
+    assert index.search("reverb") == {"dragonfly"}
+    index.remove("dragonfly")
+    assert index.search("reverb") == set()
+    assert index.with_category("Effect") == {"calf"}
+
+
+def test_reset_drops_everything():
+    index = make_index()
+    index.search("synth")
+    index.reset([entry("qsynth", "QSynth", "FluidSynth front end")])
+    assert index.search("synth") == {"qsynth"}
+    assert index.with_category("DAW") == set()
+
+
+def test_incomplete_search_only_sees_indexed_entries():
+    index = make_index()
+    assert index.search("synth", complete=False) == set()
+    assert index.flush(budget=0) is True        # out of time before the first slice
+    assert index.flush() is False
+    assert index.search("synth", complete=False) == {"zyn"}
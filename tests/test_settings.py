@@ -0,0 +1,29 @@
+import core
+
+
+def test_missing_settings_file_gives_defaults(monkeypatch, tmp_path):
+    monkeypatch.setattr(core, "SETTINGS_FILE", tmp_path / "settings.json")
+    assert core.load_settings() == core.DEFAULT_SETTINGS
+
+
+def test_invalid_settings_fall_back_to_defaults(monkeypatch, tmp_path):
+    settings = tmp_path / "settings.json"
+    settings.write_text('{"update_max_age": "6h", "prefetch_jobs": 4, "prefetch": 1,'
+                        ' "privileged_helper": "fake", "update_policy": "never"}',
+                        encoding="utf-8")
+    monkeypatch.setattr(core, "SETTINGS_FILE", settings)
+    loaded = core.load_settings()
+    assert loaded["update_max_age"] == core.DEFAULT_SETTINGS["update_max_age"]
+    assert loaded["prefetch"] is False
+    assert loaded["update_policy"] == "age"
+    assert loaded["prefetch_jobs"] == 4
+    assert loaded["privileged_helper"] == "fake"
+
+
+def test_unknown_keys_are_kept_and_choices_are_typed(monkeypatch, tmp_path):
+    settings = tmp_path / "settings.json"
+    settings.write_text('{"theme": "dark", "privileged_helper": 1}', encoding="utf-8")
+    monkeypatch.setattr(core, "SETTINGS_FILE", settings)
+    loaded = core.load_settings()
+    assert loaded["theme"] == "dark"
+    assert loaded["privileged_helper"] == core.DEFAULT_SETTINGS["privileged_helper"]
@@ -0,0 +1,100 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+import core
+
+STATUS = """\
+Package: ardour
+Status: install ok installed
+
+Package: jackd2
+Status: hold ok installed
+
+Package: lmms
+Status: deinstall ok config-files
+"""
+
+
+@pytest.fixture
+def dpkg(tmp_path, monkeypatch):
+    """A fake dpkg database and config dir; returns the status file."""
+    status = tmp_path / "status"
+    status.write_text(STATUS, encoding="utf-8")
+    (tmp_path / "updates").mkdir()
+    config = tmp_path / "config"
+    config.mkdir()
+    monkeypatch.setattr(core, "DPKG_STATUS", status)
+    monkeypatch.setattr(core, "DPKG_UPDATES", tmp_path / "updates")
+    monkeypatch.setattr(core, "CONFIG_DIR", config)
+    monkeypatch.setattr(core, "STATUS_CACHE_FILE", config / "status.cache")
+    return status
+
+
+def cached_status():
+    return json.loads(core.STATUS_CACHE_FILE.read_text(encoding="utf-8"))["status"]
+
+
+def test_concurrent_probes_keep_each_others_answers(dpkg, monkeypatch):
+    probe = core._probe_installed
+    both_inside = threading.Barrier(2, timeout=0.5)
+
+    def slow_probe(wanted):
+        try:
+            both_inside.wait()  # only reached by both at once without the lock
+        except threading.BrokenBarrierError:
+            pass
+        return probe(wanted)
+
+    monkeypatch.setattr(core, "_probe_installed", slow_probe)
+    threads = [threading.Thread(target=core.installed_packages, args=(pkgs,))
+               for pkgs in (["ardour", "qsynth"], ["jackd2", "lmms"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cached_status() == {"ardour": True, "qsynth": False, "jackd2": True, "lmms": False}
+    assert [p.name for p in dpkg.parent.joinpath("config").iterdir()] == ["status.cache"]
+
+
+def test_held_packages_count_as_installed(dpkg):
+    assert core._parse_dpkg_status(dpkg, {"ardour", "jackd2", "lmms"}) == {"ardour", "jackd2"}
+
+
+def test_dpkg_query_fallback_agrees(tmp_path, monkeypatch):
+    query = tmp_path / "dpkg-query"
+    query.write_text("#!/bin/sh\nprintf 'ardour\\tinstall ok installed\\n"
+                     "jackd2\\thold ok installed\\nlmms\\tdeinstall ok config-files\\n'\n",
+                     encoding="utf-8")
+    query.chmod(query.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    assert core._query_dpkg_status({"ardour", "jackd2", "lmms"}) == {"ardour", "jackd2"}
+
+
+def test_status_cache_is_reused_until_dpkg_changes(dpkg, monkeypatch):
+    probed = []
+    probe = core._probe_installed
+    monkeypatch.setattr(core, "_probe_installed", lambda wanted: probed.append(set(wanted))
+                        or probe(wanted))
+    assert core.installed_packages(["ardour", "lmms"]) == {"ardour"}
+    assert core.installed_packages(["ardour", "lmms"]) == {"ardour"}
+    assert core.installed_packages(["ardour", "jackd2"]) == {"ardour", "jackd2"}
+    assert probed == [{"ardour", "lmms"}, {"jackd2"}]   # only unknown names
+
+    # dpkg replaces the status file at the end of every run
+    replaced = dpkg.with_name("status-new")
+    replaced.write_text(STATUS.replace("deinstall ok config-files", "install ok installed"),
+                        encoding="utf-8")
+    os.replace(replaced, dpkg)
+    assert core.installed_packages(["ardour", "lmms"]) == {"ardour", "lmms"}
+    assert probed[-1] == {"ardour", "lmms"}
+    assert cached_status() == {"ardour": True, "lmms": True}
+
+
+def test_status_cache_can_be_bypassed(dpkg):
+    core.installed_packages(["ardour"])
+    dpkg.write_text("", encoding="utf-8")
+    assert core.installed_packages(["ardour"], use_cache=False) == set()
@@ -0,0 +1,46 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from core import AptTransaction, TransactionPlan
+
+STUB_APT = """#!/bin/sh
+echo "pmstatus:carla:50:Unpacking carla"
+echo "$@" > "$(dirname "$0")/argv"
+"""
+
+
+@pytest.fixture
+def stub_apt(tmp_path, monkeypatch):
+    """An apt-get on PATH that reports one dpkg step and records its arguments."""
+    path = tmp_path / "apt-get"
+    path.write_text(STUB_APT, encoding="utf-8")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return tmp_path
+
+
+def run(cmds):
+    done, result, lines = threading.Event(), {}, []
+    transaction = AptTransaction(cmds, lambda fraction, text: None, lines.append,
+                                 lambda ok, message: (result.update(ok=ok, message=message),
+                                                      done.set()))
+    transaction.start()
+    assert done.wait(10)
+    return result, lines, transaction
+
+
+def test_missing_prefetched_archive_does_not_fail_the_install(stub_apt, tmp_path):
+    plan = TransactionPlan(install=["carla"], prefetched=[tmp_path / "gone.deb"], update=False)
+    result, lines, transaction = run(plan.cmds(sudo=False))
+    assert result == {"ok": True, "message": ""}
+    assert any("pre-downloaded" in line for line in lines)
+    assert "install -y carla" in (stub_apt / "argv").read_text()
+    assert transaction.touched == {"carla"} and transaction.committed
+
+
+def test_failing_command_fails_the_transaction(tmp_path):
+    result, _lines, _transaction = run([["false"], ["true"]])
+    assert result["ok"] is False and "'false' failed" in result["message"]